@@ -1,19 +1,14 @@
 import sqlite3
-import bcrypt
-from PyQt5.QtWidgets import QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QFrame
-from PyQt5.QtCore import Qt
+from PyQt5.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QFrame,
+                             QProgressBar)
+from PyQt5.QtCore import Qt, QTimer
 from PyQt5.QtGui import QFont
-
-DB_PATH = "users.db"
+from database import get_user_repository
+from auth_service import AuthWorker, authenticate, register
+from models import get_models
 
 def init_db():
-    conn = sqlite3.connect(DB_PATH)
-    c = conn.cursor()
-    c.execute('''CREATE TABLE IF NOT EXISTS users 
-                 (username TEXT PRIMARY KEY, password TEXT, name TEXT, phone TEXT, 
-                  guardian_name TEXT, guardian_phone TEXT)''')
-    conn.commit()
-    conn.close()
+    get_user_repository().init_schema()
 
 class LoginDialog(QDialog):
     def __init__(self):
@@ -153,26 +148,79 @@ class LoginDialog(QDialog):
         signup_layout.addStretch()
 
         main_layout.addWidget(signup_frame)
-        self.setLayout(main_layout)
+
+        # Shown while a password is hashed or verified in the background
+        self.busy_bar = QProgressBar()
+        self.busy_bar.setRange(0, 0)
+        self.busy_bar.setTextVisible(False)
+        self.busy_bar.setFixedHeight(6)
+        self.busy_bar.setVisible(False)
+        outer_layout = QVBoxLayout()
+        outer_layout.setContentsMargins(0, 0, 0, 0)
+        outer_layout.addLayout(main_layout)
+        outer_layout.addWidget(self.busy_bar)
+
+        # Readiness of the models loading in the background
+        self.model_status = QLabel()
+        self.model_status.setStyleSheet("font-size: 12px; font-weight: 400; color: #94A3B8; padding: 0 20px 10px 20px;")
+        outer_layout.addWidget(self.model_status)
+        self.setLayout(outer_layout)
+        self.status_timer = QTimer(self)
+        self.status_timer.timeout.connect(self.update_model_status)
+        self.status_timer.start(250)
+        self.update_model_status()
+
+    def update_model_status(self):
+        status = get_models().status()
+        loading = [name for name, state in status.items() if state == "loading"]
+        failed = [name for name, state in status.items() if state.startswith("failed")]
+        if loading:
+            self.model_status.setText(f"Loading models in the background: {', '.join(loading)}...")
+        else:
+            self.status_timer.stop()
+            self.model_status.setText(f"Models ready (failed: {', '.join(failed)})" if failed else "Models ready")
+
+    def set_busy(self, busy, button=None, text=None):
+        self.busy_bar.setVisible(busy)
+        self.login_btn.setEnabled(not busy)
+        self.signup_btn.setEnabled(not busy)
+        if button is not None:
+            button.setText(text)
+
+    def run_auth(self, fn, args, on_success, on_failure):
+        # Keep a reference so the worker is not collected while it runs
+        self.auth_worker = AuthWorker(fn, *args)
+        self.auth_worker.succeeded.connect(on_success)
+        self.auth_worker.failed.connect(on_failure)
+        self.auth_worker.start()
 
     def login(self):
         username = self.username_input.text()
-        password = self.password_input.text().encode('utf-8')
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT password FROM users WHERE username = ?", (username,))
-        result = c.fetchone()
-        conn.close()
-
-        if result and bcrypt.checkpw(password, result[0].encode('utf-8')):
+        password = self.password_input.text()
+        self.set_busy(True, self.login_btn, "Verifying...")
+        self.run_auth(authenticate, (username, password),
+                      lambda ok: self.login_finished(username, ok), self.auth_failed)
+
+    def login_finished(self, username, ok):
+        self.set_busy(False, self.login_btn, "Login")
+        if ok:
             self.current_user = username
             self.accept()
         else:
             QMessageBox.warning(self, "Error", "Invalid username or password")
 
+    def auth_failed(self, error):
+        self.set_busy(False)
+        self.login_btn.setText("Login")
+        self.signup_btn.setText("Signup")
+        if isinstance(error, sqlite3.IntegrityError):
+            QMessageBox.warning(self, "Error", "Username already exists")
+        else:
+            QMessageBox.warning(self, "Error", f"Something went wrong: {error}")
+
     def signup(self):
         username = self.signup_username_input.text()
-        password = self.signup_password_input.text().encode('utf-8')
+        password = self.signup_password_input.text()
         name = self.signup_name_input.text()
         phone = self.signup_phone_input.text()
         guardian_name = self.guardian_name_input.text()
@@ -182,23 +230,18 @@ class LoginDialog(QDialog):
             QMessageBox.warning(self, "Error", "All fields are required")
             return
 
-        hashed_pw = bcrypt.hashpw(password, bcrypt.gensalt())
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        try:
-            c.execute("INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)",
-                      (username, hashed_pw.decode('utf-8'), name, phone, guardian_name, guardian_phone))
-            conn.commit()
-            QMessageBox.information(self, "Success", "Signup successful! Please login.")
-            self.signup_username_input.clear()
-            self.signup_password_input.clear()
-            self.signup_name_input.clear()
-            self.signup_phone_input.clear()
-            self.guardian_name_input.clear()
-            self.guardian_phone_input.clear()
-        except sqlite3.IntegrityError:
-            QMessageBox.warning(self, "Error", "Username already exists")
-        finally:
-            conn.close()
+        self.set_busy(True, self.signup_btn, "Creating account...")
+        self.run_auth(register, (username, password, name, phone, guardian_name, guardian_phone),
+                      self.signup_finished, self.auth_failed)
+
+    def signup_finished(self, _):
+        self.set_busy(False, self.signup_btn, "Signup")
+        QMessageBox.information(self, "Success", "Signup successful! Please login.")
+        self.signup_username_input.clear()
+        self.signup_password_input.clear()
+        self.signup_name_input.clear()
+        self.signup_phone_input.clear()
+        self.guardian_name_input.clear()
+        self.guardian_phone_input.clear()
 
 init_db()
\ No newline at end of file
@@ -0,0 +1,61 @@
+import bcrypt
+from PyQt5.QtCore import QThread, pyqtSignal
+from config import BCRYPT_ROUNDS
+from database import get_user_repository
+
+
+def hash_password(password, rounds=BCRYPT_ROUNDS):
+    return bcrypt.hashpw(password.encode('utf-8'), bcrypt.gensalt(rounds=rounds)).decode('utf-8')
+
+
+def hash_rounds(stored_hash):
+    # bcrypt hashes look like $2b$12$<salt+hash>; the middle field is the cost factor
+    try:
+        return int(stored_hash.split('$')[2])
+    except (IndexError, ValueError):
+        return 0
+
+
+def needs_rehash(stored_hash, rounds=BCRYPT_ROUNDS):
+    return hash_rounds(stored_hash) < rounds
+
+
+def authenticate(username, password):
+    # Verifies the password and, if the stored hash is cheaper than the current
+    # policy, transparently replaces it while we still have the plain password
+    users = get_user_repository()
+    stored_hash = users.get_password_hash(username)
+    if not stored_hash or not bcrypt.checkpw(password.encode('utf-8'), stored_hash.encode('utf-8')):
+        return False
+    if needs_rehash(stored_hash):
+        print(f"[DEBUG] Rehashing password for {username} from cost {hash_rounds(stored_hash)} to {BCRYPT_ROUNDS}")
+        users.update_password(username, hash_password(password))
+    return True
+
+
+def register(username, password, name, phone, guardian_name, guardian_phone):
+    # Raises sqlite3.IntegrityError if the username is taken
+    get_user_repository().create_user(username, hash_password(password), name, phone, guardian_name, guardian_phone)
+
+
+def update_profile(username, phone, guardian_name, guardian_phone, new_password=None):
+    hashed_pw = hash_password(new_password) if new_password else None
+    get_user_repository().update_profile(username, phone, guardian_name, guardian_phone, hashed_pw)
+
+
+class AuthWorker(QThread):
+    # Runs one of the functions above off the GUI thread; bcrypt releases the
+    # GIL while hashing, so the dialog keeps repainting in the meantime
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, fn, *args):
+        super().__init__()
+        self.fn = fn
+        self.args = args
+
+    def run(self):
+        try:
+            self.succeeded.emit(self.fn(*self.args))
+        except Exception as e:
+            self.failed.emit(e)
@@ -0,0 +1,620 @@
+import argparse
+import glob
+import os
+import time
+from config import LOG_DIR
+
+
+def load_log_images():
+    # Saved evidence frames; the filename prefix tells us whether a phone was in view
+    samples = []
+    for path in sorted(glob.glob(os.path.join(LOG_DIR, "*.jpg"))):
+        has_phone = os.path.basename(path).startswith("Mobile Phone_")
+        samples.append((path, has_phone))
+    return samples
+
+
+def bench_profile(args):
+    import cv2
+    from ultralytics import YOLO
+    from config import WEIGHTS_FILE, DETECTION_CLASSES, YOLO_IMAGE_SIZE, YOLO_CONFIDENCE
+    from utils import resolve_class_ids
+
+    model = YOLO(WEIGHTS_FILE)
+    phone_class_id = resolve_class_ids(model.names, ["cell phone"])[0]
+    profiles = {
+        "full (640, all classes)": {"imgsz": 640},
+        f"profile ({YOLO_IMAGE_SIZE}, filtered)": {
+            "classes": resolve_class_ids(model.names, DETECTION_CLASSES),
+            "imgsz": YOLO_IMAGE_SIZE,
+            "conf": YOLO_CONFIDENCE,
+        },
+    }
+    samples = [(cv2.imread(path), has_phone) for path, has_phone in load_log_images()]
+    print(f"{len(samples)} frames from {LOG_DIR}/")
+
+    reference = None
+    for name, kwargs in profiles.items():
+        model(samples[0][0], verbose=False, **kwargs)  # warm-up
+        predictions = []
+        start = time.perf_counter()
+        for frame, _ in samples:
+            boxes = model(frame, verbose=False, **kwargs)[0].boxes.cpu().numpy()
+            predictions.append(bool((boxes.cls == phone_class_id).any()))
+        elapsed = time.perf_counter() - start
+        correct = sum(pred == has_phone for pred, (_, has_phone) in zip(predictions, samples))
+        line = f"{name:<28} {len(samples) / elapsed:6.1f} fps  accuracy {correct / len(samples):.1%}"
+        if reference is None:
+            reference = predictions
+        else:
+            agree = sum(a == b for a, b in zip(predictions, reference))
+            line += f"  agreement with full {agree / len(samples):.1%}"
+        print(line)
+
+
+def box_iou(a, b):
+    x1, y1 = max(a[0], b[0]), max(a[1], b[1])
+    x2, y2 = min(a[2], b[2]), min(a[3], b[3])
+    inter = max(0.0, x2 - x1) * max(0.0, y2 - y1)
+    union = (a[2] - a[0]) * (a[3] - a[1]) + (b[2] - b[0]) * (b[3] - b[1]) - inter
+    return inter / union if union > 0 else 0.0
+
+
+def parity_report(paths, int8=False):
+    # Runs both detector backends over `paths`; returns the frames where they disagree on
+    # phone presence, the largest confidence delta and the lowest top-box IoU
+    import cv2
+    from detectors import TorchPhoneDetector, OnnxPhoneDetector
+
+    frames = [(path, cv2.imread(path)) for path in paths]
+    backends = [TorchPhoneDetector(), OnnxPhoneDetector(int8=int8)]
+    runs = []
+    for backend in backends:
+        backend.detect(frames[0][1])  # warm-up
+        start = time.perf_counter()
+        detections = [backend.detect(frame) for _, frame in frames]
+        fps = len(frames) / (time.perf_counter() - start)
+        runs.append(detections)
+        print(f"{backend.name:<6} {fps:6.1f} fps  phones found {sum(d.found for d in detections)}/{len(frames)}")
+
+    mismatches = []
+    worst_conf, worst_iou = 0.0, 1.0
+    for (path, _), reference, candidate in zip(frames, *runs):
+        if reference.found != candidate.found:
+            mismatches.append(path)
+            print(f"  mismatch: {os.path.basename(path)}")
+            continue
+        if reference.found:
+            worst_conf = max(worst_conf, abs(reference.confidence - candidate.confidence))
+            best_ref = reference.boxes[reference.confidences.argmax()]
+            best_cand = candidate.boxes[candidate.confidences.argmax()]
+            worst_iou = min(worst_iou, box_iou(best_ref, best_cand))
+    return mismatches, worst_conf, worst_iou
+
+
+def bench_parity(args):
+    # The ONNX backend should agree with PyTorch on the saved phone frames
+    paths = [path for path, has_phone in load_log_images() if has_phone]
+    mismatches, worst_conf, worst_iou = parity_report(paths, args.int8)
+    print(f"found mismatches {len(mismatches)}  max confidence delta {worst_conf:.3f}  min top-box IoU {worst_iou:.3f}")
+    if len(mismatches) > args.max_mismatches or worst_iou < args.min_iou:
+        raise SystemExit("Parity check failed")
+    print("Parity check passed")
+
+
+def bench_ear(args):
+    # Vectorised EAR against the previous per-eye implementation, on synthetic landmarks
+    import math
+    import random
+    import numpy as np
+    from types import SimpleNamespace
+    from config import LEFT_EYE, RIGHT_EYE
+    from ear import landmarks_to_points, mean_ear, batch_mean_ear
+
+    def scipy_ear(eye):
+        from scipy.spatial import distance
+        v1 = distance.euclidean(eye[1], eye[5])
+        v2 = distance.euclidean(eye[2], eye[4])
+        h = distance.euclidean(eye[0], eye[3])
+        return (v1 + v2) / (2.0 * h)
+
+    def tuple_ear(eye):
+        v1 = math.dist(eye[1], eye[5])
+        v2 = math.dist(eye[2], eye[4])
+        h = math.dist(eye[0], eye[3])
+        return (v1 + v2) / (2.0 * h)
+
+    def per_eye(ear_fn):
+        def run(face, w, h):
+            left = [(int(face.landmark[i].x * w), int(face.landmark[i].y * h)) for i in LEFT_EYE]
+            right = [(int(face.landmark[i].x * w), int(face.landmark[i].y * h)) for i in RIGHT_EYE]
+            return (ear_fn(left) + ear_fn(right)) / 2.0
+        return run
+
+    def vectorised(face, w, h):
+        return mean_ear(landmarks_to_points(face, w, h))
+
+    w, h = 1280, 720
+    faces = [SimpleNamespace(landmark=[SimpleNamespace(x=random.random(), y=random.random()) for _ in range(478)])
+             for _ in range(args.frames)]
+    implementations = [("per-eye math.dist", per_eye(tuple_ear)), ("numpy vectorised", vectorised)]
+    try:
+        import scipy  # noqa: F401  the previous implementation, if it is still installed
+        implementations.insert(0, ("per-eye scipy", per_eye(scipy_ear)))
+    except ImportError:
+        pass
+    for name, fn in implementations:
+        start = time.perf_counter()
+        for face in faces:
+            fn(face, w, h)
+        elapsed = time.perf_counter() - start
+        print(f"{name:<18} {elapsed / len(faces) * 1e6:8.1f} us/frame")
+
+    points = np.stack([landmarks_to_points(face, w, h) for face in faces])
+    start = time.perf_counter()
+    batch_mean_ear(points)
+    elapsed = time.perf_counter() - start
+    print(f"{'numpy batch':<18} {elapsed / len(faces) * 1e6:8.1f} us/frame ({len(faces)} frames in one call)")
+
+
+def bench_bcrypt(args):
+    # Cost of each work factor, and the longest event-loop stall while verifying
+    # on the GUI thread versus on an AuthWorker
+    import bcrypt
+    from PyQt5.QtCore import QCoreApplication, QTimer, QElapsedTimer
+    from auth_service import AuthWorker
+
+    password = b"correct horse battery staple"
+    for rounds in args.rounds:
+        stored = bcrypt.hashpw(password, bcrypt.gensalt(rounds=rounds))
+        start = time.perf_counter()
+        bcrypt.checkpw(password, stored)
+        print(f"cost {rounds:>2}: {(time.perf_counter() - start) * 1000:7.1f} ms per verification")
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    stored = bcrypt.hashpw(password, bcrypt.gensalt(rounds=max(args.rounds)))
+
+    def longest_stall(start_work):
+        # Ticks a 10ms timer and records the largest gap between ticks while the work runs
+        clock, gaps = QElapsedTimer(), []
+        ticker = QTimer()
+        ticker.setInterval(10)
+        ticker.timeout.connect(lambda: (gaps.append(clock.restart())))
+        clock.start()
+        ticker.start()
+        start_work()
+        app.exec_()
+        ticker.stop()
+        return max(gaps) if gaps else clock.elapsed()
+
+    def inline():
+        QTimer.singleShot(0, lambda: (bcrypt.checkpw(password, stored), QTimer.singleShot(50, app.quit)))
+
+    def threaded():
+        worker = AuthWorker(bcrypt.checkpw, password, stored)
+        worker.finished.connect(lambda: QTimer.singleShot(50, app.quit))
+        threaded.worker = worker
+        worker.start()
+
+    print(f"GUI thread stall at cost {max(args.rounds)}: inline {longest_stall(inline)} ms, "
+          f"AuthWorker {longest_stall(threaded)} ms")
+
+
+STARTUP_SCRIPT = """
+import sys, time
+start = time.perf_counter()
+from PyQt5.QtWidgets import QApplication
+app = QApplication(sys.argv)
+if {eager}:
+    # Old startup: every model is built before the login dialog appears
+    import gui
+    from models import get_models
+    get_models().load_all()
+else:
+    from models import get_models
+    get_models().preload()
+from auth import LoginDialog
+dialog = LoginDialog()
+dialog.show()
+app.processEvents()
+shown = time.perf_counter() - start
+registry = get_models()
+if registry.thread is not None:
+    registry.thread.join()
+print(shown, time.perf_counter() - start)
+"""
+
+
+def bench_startup(args):
+    # Each run is a fresh interpreter so import costs are counted every time
+    import statistics
+    import subprocess
+    import sys
+
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get("QT_QPA_PLATFORM", "offscreen"))
+    for label, eager in (("eager (old)", True), ("lazy registry", False)):
+        shown, ready = [], []
+        for _ in range(args.runs):
+            result = subprocess.run([sys.executable, "-c", STARTUP_SCRIPT.format(eager=eager)], env=env,
+                                    capture_output=True, text=True)
+            if result.returncode != 0:
+                break
+            first, last = map(float, result.stdout.strip().splitlines()[-1].split())
+            shown.append(first)
+            ready.append(last)
+        if not shown:
+            print(f"{label:<14} failed: {result.stderr.strip().splitlines()[-1]}")
+            continue
+        print(f"{label:<14} login window {statistics.median(shown) * 1000:7.0f} ms   "
+              f"models ready {statistics.median(ready) * 1000:7.0f} ms   (median of {args.runs})")
+
+
+def bench_switch(args):
+    # Time to the first frame for a new session: a fresh detection thread
+    # (camera open + model warm-up) versus rebinding the long-lived service
+    from PyQt5.QtCore import QCoreApplication
+    from models import get_models
+    from detection_thread import DetectionThread
+
+    app = QCoreApplication.instance() or QCoreApplication([])
+    models = get_models()
+    models.load_all(["detector", "face_mesh"])
+
+    def first_frame(service):
+        start = time.perf_counter()
+        while service.take_frame() is None:
+            app.processEvents()
+            time.sleep(0.001)
+        return time.perf_counter() - start
+
+    cold = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        service = DetectionThread(models, f"bench-{i}")
+        service.start()
+        first_frame(service)
+        cold.append(time.perf_counter() - start)
+        service.stop()
+
+    service = DetectionThread(models, "bench")
+    service.start()
+    first_frame(service)
+    warm = []
+    for i in range(args.runs):
+        start = time.perf_counter()
+        service.unbind_user()
+        service.bind_user(f"bench-{i}")
+        first_frame(service)
+        warm.append(time.perf_counter() - start)
+    service.stop()
+
+    print(f"new detection thread {sorted(cold)[len(cold) // 2] * 1000:7.0f} ms to first frame")
+    print(f"rebind service       {sorted(warm)[len(warm) // 2] * 1000:7.0f} ms to first frame")
+
+
+def bench_pdf(args):
+    # Old in-loop `text +=` extraction vs the worker-process pipeline vs the stored text
+    import tempfile
+    import PyPDF2
+    from pdf_ingest import extract_text
+    from notes_library import TextStore
+
+    start = time.perf_counter()
+    text = ""
+    for page in PyPDF2.PdfReader(args.path).pages:
+        text += page.extract_text()
+    print(f"sequential     {time.perf_counter() - start:7.2f} s")
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = TextStore(directory)
+        for label in ("parallel", "cached"):
+            start = time.perf_counter()
+            document = extract_text(args.path, store=store)
+            print(f"{label:<14} {time.perf_counter() - start:7.2f} s  ({len(document.text)} pages)")
+
+
+def synthetic_notes(paragraphs, seed=1):
+    import random
+    rng = random.Random(seed)
+    words = "cell energy light plant water carbon oxygen glucose enzyme membrane protein nucleus".split()
+    return ["; ".join(" ".join(rng.choice(words) for _ in range(12)) for _ in range(rng.randint(2, 8))).capitalize() + "."
+            for _ in range(paragraphs)]
+
+
+def bench_summarize(args):
+    # Map-reduce summarization against the fake LLM client: concurrency and chunk-cache reuse after an edit
+    import tempfile
+    from llm import FakeLLMClient
+    from summarizer import Summarizer
+    from llm_cache import LLMCache
+
+    paragraphs = synthetic_notes(args.paragraphs)
+    text = "\n\n".join(paragraphs)
+    print(f"~{len(text) // 4} tokens of notes, {args.latency * 1000:.0f} ms per fake request")
+    for in_flight in args.in_flight:
+        with tempfile.TemporaryDirectory() as directory:
+            cache = LLMCache(os.path.join(directory, "cache.db"))
+            summarizer = Summarizer(FakeLLMClient(args.latency), cache, max_in_flight=in_flight)
+            start = time.perf_counter()
+            summarizer.summarize(text)
+            print(f"{in_flight:>2} in flight  {time.perf_counter() - start:6.2f} s  {summarizer.requests} requests")
+
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(os.path.join(directory, "cache.db"))
+        Summarizer(FakeLLMClient(args.latency), cache).summarize(text)
+        paragraphs[len(paragraphs) // 2] += " An edited sentence."
+        summarizer = Summarizer(FakeLLMClient(args.latency), cache)
+        start = time.perf_counter()
+        summarizer.summarize("\n\n".join(paragraphs))
+        print(f"after one edit {time.perf_counter() - start:6.2f} s  {summarizer.requests} requests, "
+              f"{summarizer.cache_hits} from cache")
+
+
+def bench_llm_cache(args):
+    # Repeat requests should be served from disk in milliseconds; the store stays under its size limit
+    import tempfile
+    from llm import FakeLLMClient
+    from llm_cache import LLMCache, cached_generate
+
+    client = FakeLLMClient(args.latency)
+    documents = ["\n\n".join(synthetic_notes(50, seed)) for seed in range(args.documents)]
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(os.path.join(directory, "cache.db"), max_bytes=args.max_kb * 1024)
+        for label in ("cold", "warm"):
+            start = time.perf_counter()
+            for document in documents:
+                cached_generate(client, "Summarize:\n\n{text}", document, cache)
+            elapsed = (time.perf_counter() - start) / len(documents)
+            print(f"{label}  {elapsed * 1000:8.2f} ms per request")
+        stats = cache.stats()
+        print(f"hits {stats['hits']}  misses {stats['misses']}  evictions {stats['evictions']}  "
+              f"entries {stats['entries']}  {stats['bytes'] / 1024:.0f} KiB stored (limit {args.max_kb} KiB)")
+
+
+def bench_stream(args):
+    # Time to first visible text, waiting for the full response vs streaming the final summary
+    import tempfile
+    from llm import FakeLLMClient
+    from llm_cache import LLMCache
+    from summarizer import Summarizer
+
+    client = FakeLLMClient(args.latency, token_latency=args.token_latency)
+    print(f"fake LLM: {args.latency * 1000:.0f} ms to first token, {args.token_latency * 1000:.0f} ms per token")
+    for paragraphs in args.paragraphs:
+        text = "\n\n".join(synthetic_notes(paragraphs))
+        for label, stream in (("blocking", False), ("streaming", True)):
+            with tempfile.TemporaryDirectory() as directory:
+                summarizer = Summarizer(client, LLMCache(os.path.join(directory, "cache.db")))
+                first = []
+                start = time.perf_counter()
+                on_text = (lambda piece: first or first.append(time.perf_counter() - start)) if stream else None
+                summarizer.summarize(text, on_text=on_text)
+                total = time.perf_counter() - start
+                first_text = first[0] if first else total
+                print(f"{paragraphs:>5} paragraphs  {label:<9}  first text {first_text * 1000:7.0f} ms  "
+                      f"complete {total * 1000:7.0f} ms")
+
+
+def bench_quiz(args):
+    # Concurrent, streamed quiz generation against the fake client, which writes invalid JSON for every Nth question
+    import tempfile
+    from llm import FakeLLMClient
+    from llm_cache import LLMCache
+    from quiz_engine import QuizEngine
+
+    text = "\n\n".join(synthetic_notes(args.paragraphs))
+    with tempfile.TemporaryDirectory() as directory:
+        cache = LLMCache(os.path.join(directory, "cache.db"))
+        client = FakeLLMClient(args.latency, token_latency=args.token_latency, malformed_every=args.malformed_every)
+        for label in ("cold", "cached"):
+            engine = QuizEngine(client, cache)
+            first = []
+            start = time.perf_counter()
+            questions = engine.generate(text, args.questions,
+                                        on_question=lambda q: first or first.append(time.perf_counter() - start))
+            total = time.perf_counter() - start
+            print(f"{label:<6} {len(questions)}/{args.questions} questions  first after {first[0] * 1000:6.0f} ms  "
+                  f"all after {total * 1000:6.0f} ms  {engine.requests} requests, {engine.invalid} invalid questions")
+
+        # The old approach: one request for every question, usable only once the whole response is parsed
+        start = time.perf_counter()
+        client.generate(f"Write {args.questions} multiple-choice questions based on the notes below.\n\nNotes:\n\n{text}")
+        print(f"single blocking request  first question after {(time.perf_counter() - start) * 1000:6.0f} ms")
+
+
+def bench_bank(args):
+    # Repeated quizzes on one document over simulated days: questions drawn from the bank
+    # by the Leitner scheduler, with the fake client asked only for the shortfall
+    import random
+    import tempfile
+    from database import ConnectionPool
+    from llm import FakeLLMClient
+    from llm_cache import LLMCache
+    from question_bank import QuestionBank
+    from quiz_engine import QuizEngine
+
+    text = "\n\n".join(synthetic_notes(args.paragraphs))
+    rng = random.Random(1)
+    with tempfile.TemporaryDirectory() as directory:
+        bank = QuestionBank(ConnectionPool(os.path.join(directory, "bank.db"), size=2))
+        cache = LLMCache(os.path.join(directory, "cache.db"))
+        client = FakeLLMClient(args.latency, token_latency=args.token_latency)
+        now, requests = time.time(), 0
+        for day in range(1, args.days + 1):
+            start = time.perf_counter()
+            questions = bank.sample("bench", "doc", args.questions, now=now)
+            served = len(questions)
+            if served < args.questions:
+                engine = QuizEngine(client, cache)
+                known = bank.known_questions("doc")
+                new = engine.generate(text, args.questions - served, exclude=known, first_variant=len(known) + 1)
+                questions += [q for q in (bank.add("doc", q) for q in new) if q is not None]
+                requests += engine.requests
+            elapsed = time.perf_counter() - start
+            for q in questions:
+                correct = rng.random() < args.accuracy
+                bank.record_answer("bench", q["id"], q["correct_answer"] if correct else None, correct, now=now)
+            stats = bank.stats("bench", "doc", now=now)
+            print(f"day {day:>2}  {served:>3} from bank  {len(questions) - served:>3} generated  "
+                  f"ready after {elapsed * 1000:7.1f} ms  bank {stats.questions} questions")
+            now += 86400
+        print(f"{requests} LLM requests over {args.days} quizzes of {args.questions} questions")
+
+
+def bench_index(args):
+    # Topic retrieval over large notes: index build/open time, query latency and whether
+    # planted topic paragraphs come back, against rescanning the passages for every query
+    import statistics
+    import tempfile
+    from notes_index import IndexStore, tokenize
+    from text_chunks import split_chunks
+    from config import INDEX_CHUNK_TOKENS
+
+    topics = ["mitochondria produce atp through oxidative phosphorylation",
+              "chlorophyll absorbs red and blue wavelengths inside thylakoid membranes",
+              "ribosomes translate messenger rna into polypeptide chains",
+              "osmosis moves solvent across a semipermeable barrier",
+              "stomata regulate transpiration and gas exchange"]
+    paragraphs = synthetic_notes(args.paragraphs)
+    step = len(paragraphs) // (len(topics) * 3)
+    for n in range(len(topics) * 3):
+        paragraphs[n * step] = f"Remember that {topics[n % len(topics)]}."
+    text = "\n\n".join(paragraphs)
+    queries = [" ".join(topic.split()[:2]) for topic in topics]
+    print(f"{len(text) / 1e6:.1f} MB of notes, {len(queries)} topic queries, top {args.k}")
+    with tempfile.TemporaryDirectory() as directory:
+        store = IndexStore(directory)
+        start = time.perf_counter()
+        index = store.get("notes", text)
+        print(f"build          {time.perf_counter() - start:7.2f} s  ({len(index)} passages)")
+        start = time.perf_counter()
+        index = store.load("notes")
+        print(f"open (mmap)    {(time.perf_counter() - start) * 1000:7.2f} ms")
+
+        timings, found, sizes = [], 0, []
+        for _ in range(args.repeat):
+            for query, topic in zip(queries, topics):
+                start = time.perf_counter()
+                passages = index.retrieve(query, args.k)
+                timings.append(time.perf_counter() - start)
+                found += passages.count(topic)
+                sizes.append(len(passages))
+        print(f"indexed query  p50 {statistics.median(timings) * 1000:7.2f} ms  max {max(timings) * 1000:7.2f} ms  "
+              f"recall {found / (3 * len(queries) * args.repeat):.0%}  "
+              f"prompt ~{statistics.mean(sizes) / 4:.0f} tokens vs {len(text) / 4:.0f} for the whole notes")
+
+        # Without an index: split and tokenize every passage for each query
+        start = time.perf_counter()
+        for query in queries:
+            words = set(tokenize(query))
+            scores = [sum(word in words for word in tokenize(chunk)) for chunk in split_chunks(text, INDEX_CHUNK_TOKENS)]
+            sorted(range(len(scores)), key=scores.__getitem__)[-args.k:]
+        print(f"rescan query   {(time.perf_counter() - start) / len(queries) * 1000:7.2f} ms")
+
+
+def bench_library(args):
+    # A library of documents in the memory-mapped text store: opening cost, page access, and
+    # peak memory summarizing all of them one at a time vs holding their text concatenated
+    import tempfile
+    import tracemalloc
+    from llm import FakeLLMClient
+    from llm_cache import LLMCache
+    from notes_library import TextStore
+    from summarizer import Summarizer
+
+    with tempfile.TemporaryDirectory() as directory:
+        store = TextStore(os.path.join(directory, "text"))
+        for n in range(args.documents):
+            paragraphs = synthetic_notes(args.paragraphs, seed=n)
+            store.store(f"doc{n}", ["\n\n".join(paragraphs[i:i + 20]) for i in range(0, len(paragraphs), 20)])
+        start = time.perf_counter()
+        documents = [store.load(f"doc{n}") for n in range(args.documents)]
+        total = sum(document.size for document in documents)
+        print(f"open {args.documents} documents ({total / 1e6:.1f} MB)  {(time.perf_counter() - start) * 1000:7.2f} ms")
+        start = time.perf_counter()
+        pages = sum(len(document.page(len(document) // 2)) for document in documents)
+        print(f"middle page of each               {(time.perf_counter() - start) * 1000:7.2f} ms  ({pages} bytes)")
+
+        client = FakeLLMClient()
+        for label, run in (("one at a time", lambda summarizer: summarizer.summarize_documents(documents)),
+                           ("concatenated", lambda summarizer: summarizer.summarize(
+                               "\n\n".join(document.read() for document in documents)))):
+            summarizer = Summarizer(client, LLMCache(os.path.join(directory, f"{label}.db")))
+            tracemalloc.start()
+            start = time.perf_counter()
+            run(summarizer)
+            elapsed = time.perf_counter() - start
+            peak = tracemalloc.get_traced_memory()[1]
+            tracemalloc.stop()
+            print(f"summarize {label:<14}  {elapsed:6.2f} s  peak {peak / 1e6:6.1f} MB  {summarizer.requests} requests")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Study Buddy performance benchmarks")
+    commands = parser.add_subparsers(dest="command", required=True)
+    commands.add_parser("profile", help="YOLO detection profile fps/accuracy on logs/*.jpg").set_defaults(func=bench_profile)
+    parity = commands.add_parser("parity", help="ONNX Runtime vs PyTorch detector parity on logs/Mobile Phone_*.jpg")
+    parity.add_argument("--int8", action="store_true", help="Compare the INT8-quantized ONNX model")
+    parity.add_argument("--max-mismatches", type=int, default=0, help="Frames allowed to disagree on phone presence")
+    parity.add_argument("--min-iou", type=float, default=0.8, help="Lowest acceptable IoU between top boxes")
+    parity.set_defaults(func=bench_parity)
+    ear = commands.add_parser("ear", help="Eye-aspect-ratio micro-benchmark")
+    ear.add_argument("--frames", type=int, default=5000, help="Synthetic faces to evaluate")
+    ear.set_defaults(func=bench_ear)
+    bcrypt_bench = commands.add_parser("bcrypt", help="bcrypt cost per work factor and GUI-thread responsiveness")
+    bcrypt_bench.add_argument("--rounds", type=int, nargs="+", default=[10, 12, 13], help="Work factors to time")
+    bcrypt_bench.set_defaults(func=bench_bcrypt)
+    startup = commands.add_parser("startup", help="Time from launch to the login window, eager vs lazy model loading")
+    startup.add_argument("--runs", type=int, default=5, help="Fresh interpreter launches per mode")
+    startup.set_defaults(func=bench_startup)
+    switch = commands.add_parser("switch", help="User switch latency, new detection thread vs rebinding the service")
+    switch.add_argument("--runs", type=int, default=5, help="Switches to time per mode")
+    switch.set_defaults(func=bench_switch)
+    pdf = commands.add_parser("pdf", help="PDF text extraction: sequential vs worker processes vs cache")
+    pdf.add_argument("path", help="PDF to extract")
+    pdf.set_defaults(func=bench_pdf)
+    summarize = commands.add_parser("summarize", help="Map-reduce summarization with the fake LLM client")
+    summarize.add_argument("--paragraphs", type=int, default=2000, help="Paragraphs of synthetic notes")
+    summarize.add_argument("--latency", type=float, default=0.05, help="Seconds per fake LLM request")
+    summarize.add_argument("--in-flight", type=int, nargs="+", default=[1, 4, 8], help="Concurrency levels to time")
+    summarize.set_defaults(func=bench_summarize)
+    llm_cache = commands.add_parser("llmcache", help="LLM response cache latency, hit rate and eviction")
+    llm_cache.add_argument("--documents", type=int, default=40, help="Distinct documents to request twice")
+    llm_cache.add_argument("--latency", type=float, default=0.5, help="Seconds per fake LLM request")
+    llm_cache.add_argument("--max-kb", type=int, default=2048, help="Cache size limit in KiB")
+    llm_cache.set_defaults(func=bench_llm_cache)
+    stream = commands.add_parser("stream", help="Time to first summary text, blocking vs streaming")
+    stream.add_argument("--paragraphs", type=int, nargs="+", default=[20, 300], help="Document sizes to try")
+    stream.add_argument("--latency", type=float, default=0.5, help="Fake LLM seconds to first token")
+    stream.add_argument("--token-latency", type=float, default=0.005, help="Fake LLM seconds per token")
+    stream.set_defaults(func=bench_stream)
+    quiz = commands.add_parser("quiz", help="Quiz engine: time to first/all questions and re-asks, fake LLM client")
+    quiz.add_argument("--questions", type=int, default=120, help="Questions to generate")
+    quiz.add_argument("--paragraphs", type=int, default=400, help="Paragraphs of synthetic notes")
+    quiz.add_argument("--latency", type=float, default=0.5, help="Fake LLM seconds to first token")
+    quiz.add_argument("--token-latency", type=float, default=0.002, help="Fake LLM seconds per token")
+    quiz.add_argument("--malformed-every", type=int, default=10, help="Every Nth fake question is invalid JSON")
+    quiz.set_defaults(func=bench_quiz)
+    bank = commands.add_parser("bank", help="Question bank: quizzes served from the bank vs generated, fake LLM client")
+    bank.add_argument("--days", type=int, default=10, help="Daily quizzes to simulate")
+    bank.add_argument("--questions", type=int, default=10, help="Questions per quiz")
+    bank.add_argument("--accuracy", type=float, default=0.7, help="Chance the simulated student answers correctly")
+    bank.add_argument("--paragraphs", type=int, default=200, help="Paragraphs of synthetic notes")
+    bank.add_argument("--latency", type=float, default=0.3, help="Seconds per fake LLM request")
+    bank.add_argument("--token-latency", type=float, default=0.005, help="Seconds between streamed pieces")
+    bank.set_defaults(func=bench_bank)
+    index = commands.add_parser("index", help="Topic index over large notes: build, open and query latency, recall")
+    index.add_argument("--paragraphs", type=int, default=20000, help="Paragraphs of synthetic notes")
+    index.add_argument("-k", type=int, default=8, help="Passages retrieved per query")
+    index.add_argument("--repeat", type=int, default=20, help="Times each query is timed")
+    index.set_defaults(func=bench_index)
+    library = commands.add_parser("library", help="Notes library: memory-mapped text, lazy loading, multi-document summary")
+    library.add_argument("--documents", type=int, default=10, help="Documents in the library")
+    library.add_argument("--paragraphs", type=int, default=4000, help="Paragraphs of synthetic notes per document")
+    library.set_defaults(func=bench_library)
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
@@ -7,23 +7,42 @@ load_dotenv()
 # Google API Key for Gemini AI
 GOOGLE_API_KEY = os.getenv("GOOGLE_API_KEY")
 if not GOOGLE_API_KEY:
-    print("Error: GOOGLE_API_KEY not found in .env file. Please set it and try again.")
-    import sys
-    sys.exit(1)
+    print("[ERROR] GOOGLE_API_KEY not found in .env file. Summaries and quizzes will be unavailable.")
+GEMINI_MODEL = 'gemini-1.5-flash'  # Model used for summaries and quizzes
 
 # Twilio credentials for WhatsApp messaging
 TWILIO_SID = os.getenv("TWILIO_SID")
 TWILIO_AUTH_TOKEN = os.getenv("TWILIO_AUTH_TOKEN")
 TWILIO_PHONE = os.getenv("TWILIO_PHONE")
 if not all([TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE]):
-    print("Error: One or more Twilio credentials (TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE) not found in .env file. Please set them and try again.")
-    import sys
-    sys.exit(1)
+    print("[ERROR] One or more Twilio credentials (TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE) not found in .env file. Guardian alerts will not be sent.")
+
+# Database
+DB_PATH = "users.db"  # SQLite database for users, events and the notification outbox
+DB_POOL_SIZE = 4  # Connections shared by the GUI, detection and background threads
+BCRYPT_ROUNDS = 12  # bcrypt work factor; weaker stored hashes are upgraded on the next login
+
+# Guardian notification outbox
+NOTIFY_TRANSPORT = "twilio"  # "twilio" sends WhatsApp messages, "fake" only records them locally
+GUARDIAN_MIN_INTERVAL = 600  # Seconds between messages to one guardian; events in between are sent as a digest
+NOTIFY_MAX_ATTEMPTS = 5  # Send attempts before a notification is marked failed
+NOTIFY_RETRY_BACKOFF = 5  # Seconds before the first retry, doubled on every further attempt
+NOTIFY_POLL_INTERVAL = 1.0  # Seconds between outbox checks for due retries and digests
 
 # YOLO weights configuration
 WEIGHTS_FILE = 'yolov8n.pt'
 WEIGHTS_URL = 'https://github.com/ultralytics/assets/releases/download/v8.3.0/yolov8n.pt'
 
+# Models are loaded lazily; these are warmed in the background while the login dialog is shown
+MODEL_PRELOAD_ORDER = ["face_mesh", "detector", "gemini"]
+
+# YOLO detection profile
+DETECTION_CLASSES = ["cell phone"]  # COCO classes inference is restricted to
+YOLO_IMAGE_SIZE = 320  # Inference input size (320 is faster, 640 is more accurate)
+YOLO_CONFIDENCE = 0.35  # Boxes below this confidence are discarded
+DETECTOR_BACKEND = "torch"  # "torch" (PyTorch) or "onnx" (ONNX Runtime export cached next to WEIGHTS_FILE)
+DETECTOR_INT8 = False  # Use an INT8-quantized ONNX model (onnx backend only)
+
 # Eye landmarks indices (MediaPipe Face Mesh)
 # Note: These indices are swapped compared to your original (LEFT_EYE was right eye indices and vice versa)
 LEFT_EYE = [33, 160, 158, 133, 153, 144]  # Corrected for left eye
@@ -32,7 +51,54 @@ RIGHT_EYE = [362, 385, 387, 263, 373, 380]  # Corrected for right eye
 # Constants
 EYE_AR_THRESHOLD = 0.25  # Eye Aspect Ratio threshold for detecting closed eyes
 EYE_CLOSED_DURATION = 5  # Seconds eyes must be closed to trigger dozing alert
-MOBILE_PHONE_THRESHOLD = 5  # Frames a phone must be detected to trigger alert
+MOBILE_PHONE_THRESHOLD = 5  # Consecutive YOLO passes that must see a phone to trigger alert
 ALERT_COOLDOWN = 5  # Seconds between consecutive alerts
+TARGET_FPS = 30  # Frame rate the render stage paces the video feed to
+PIPELINE_QUEUE_SIZE = 1  # Frames buffered between pipeline stages (oldest dropped first)
+DISPLAY_SIZE = (800, 600)  # Focus Zone video size; frames are scaled to fit before reaching the GUI
+FRAME_RING_SLOTS = 3  # Preallocated display buffers reused round-robin
+DISPLAY_FPS = 30  # Rate the GUI pulls the latest frame at, independent of detection speed
+MOBILE_PHONE_DURATION = 0.75  # Seconds a phone must also stay in view to trigger alert
+PHONE_DETECT_INTERVAL = 6  # Run full YOLO inference every N frames while nothing is happening
+PHONE_BOOST_INTERVAL = 1  # YOLO cadence (frames) right after a phone candidate is seen
+PHONE_BOOST_DURATION = 3  # Seconds the raised cadence lasts after a phone candidate
+MOTION_THRESHOLD = 0.04  # Scene-change score (0-1) that forces an immediate YOLO pass
+FACE_ROI_MARGIN = 0.4  # Margin added around the last face box when cropping (fraction of its size)
+FACE_ROI_MIN_SIZE = 64  # Pixels; smaller face crops fall back to full-frame detection
+DETECTION_EXECUTION_MODE = "parallel"  # "parallel" runs YOLO and FaceMesh concurrently, "sequential" one after another
+SPEECH_RATE = 150  # Words per minute for spoken alerts
+SPEECH_MAX_AGE = 10  # Seconds an alert may wait to be spoken before it is dropped as stale
 LOG_DIR = "logs"  # Directory for log files and images
-LOG_FILE = os.path.join(LOG_DIR, "distractions.log")  # Path to log file
\ No newline at end of file
+EVIDENCE_JPEG_QUALITY = 85  # JPEG quality of saved distraction snapshots
+EVIDENCE_MAX_WIDTH = 0  # Downscale snapshots wider than this (pixels); 0 keeps full resolution
+EVIDENCE_WORKERS = 2  # Threads encoding and writing snapshots
+EVIDENCE_QUEUE_SIZE = 8  # Snapshots waiting to be written before new ones are dropped
+LEGACY_LOG_FILE = os.path.join(LOG_DIR, "distraction_log.txt")  # Old free-text log, imported into the event store once
+# Notes ingestion
+CACHE_DIR = "cache"  # Extracted text, summaries and other derived data; safe to delete
+LIBRARY_DIR = "library"  # Extracted text of every document in a user's notes library
+PDF_WORKERS = 4  # Worker processes extracting PDF pages in parallel
+PDF_PAGES_PER_TASK = 8  # Pages each worker extracts per task; documents this short are extracted in-process
+
+# Summaries
+LLM_BACKEND = "gemini"  # "gemini" calls the API, "fake" answers locally (offline runs and benchmarks)
+CHARS_PER_TOKEN = 4  # Rough token estimate used to size prompts without a network round trip
+SUMMARY_CHUNK_TOKENS = 3000  # Upper bound on the notes text sent in one summary request
+SUMMARY_MAX_IN_FLIGHT = 4  # Concurrent summary requests
+SUMMARY_REDUCE_FAN_IN = 8  # Partial summaries combined per reduce request
+LLM_CACHE_PATH = os.path.join(CACHE_DIR, "llm_cache.db")  # Gemini responses keyed by (model, prompt template, document)
+LLM_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Least recently used responses are evicted beyond this size
+LLM_CACHE_TTL = 30 * 24 * 3600  # Seconds a cached response stays valid
+
+# Quizzes
+QUIZ_DEFAULT_QUESTIONS = 5  # Questions generated per quiz unless the user asks for more
+QUIZ_QUESTIONS_PER_REQUEST = 8  # Questions asked for in one Gemini request
+QUIZ_CHUNK_TOKENS = 2000  # Notes text behind each quiz request; different requests cover different parts
+QUIZ_MAX_IN_FLIGHT = 4  # Concurrent quiz requests
+QUIZ_MAX_RETRIES = 2  # Times questions that failed validation are asked for again
+QUESTION_BOX_INTERVALS = [0, 86400, 3 * 86400, 7 * 86400, 21 * 86400]  # Leitner boxes: seconds until a question is due again
+
+# Topic retrieval
+INDEX_CHUNK_TOKENS = 250  # Size of the passages the notes index retrieves
+INDEX_HASH_BUCKETS = 1 << 18  # Words are hashed into this many index columns instead of keeping a vocabulary
+INDEX_TOP_K = 8  # Passages sent to Gemini for a topic-focused summary or quiz
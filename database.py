@@ -0,0 +1,125 @@
+import sqlite3
+import queue
+import threading
+import contextlib
+from collections import namedtuple
+from config import DB_PATH, DB_POOL_SIZE
+
+UserProfile = namedtuple("UserProfile", ["username", "name", "phone", "guardian_name", "guardian_phone"])
+
+# sqlite3 compiles each distinct SQL string once per connection and keeps it in
+# the connection's statement cache, so reusing these constants on pooled
+# connections means every query after the first runs as a prepared statement.
+CREATE_USERS = '''CREATE TABLE IF NOT EXISTS users
+                  (username TEXT PRIMARY KEY, password TEXT, name TEXT, phone TEXT,
+                   guardian_name TEXT, guardian_phone TEXT)'''
+SELECT_PASSWORD = "SELECT password FROM users WHERE username = ?"
+SELECT_PROFILE = "SELECT username, name, phone, guardian_name, guardian_phone FROM users WHERE username = ?"
+INSERT_USER = "INSERT INTO users VALUES (?, ?, ?, ?, ?, ?)"
+UPDATE_PROFILE = "UPDATE users SET phone = ?, guardian_name = ?, guardian_phone = ? WHERE username = ?"
+UPDATE_PROFILE_AND_PASSWORD = "UPDATE users SET phone = ?, guardian_name = ?, guardian_phone = ?, password = ? WHERE username = ?"
+UPDATE_PASSWORD = "UPDATE users SET password = ? WHERE username = ?"
+
+
+class ConnectionPool:
+    # A fixed set of connections to users.db shared by every thread, in WAL mode
+    # so the GUI, detection and notification threads can read while another writes
+    def __init__(self, db_path=DB_PATH, size=DB_POOL_SIZE):
+        self.db_path = db_path
+        self.idle = queue.LifoQueue()
+        for _ in range(size):
+            self.idle.put(self.connect())
+
+    def connect(self):
+        conn = sqlite3.connect(self.db_path, check_same_thread=False, timeout=10, cached_statements=128)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextlib.contextmanager
+    def connection(self):
+        # Commits on success, rolls back on error, and always returns the connection to the pool
+        conn = self.idle.get()
+        try:
+            yield conn
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+        finally:
+            self.idle.put(conn)
+
+
+class UserRepository:
+    # All access to the users table. Profiles (including the guardian's phone)
+    # are cached per user and invalidated whenever they are written, so repeated
+    # lookups such as guardian notifications are served from memory.
+    def __init__(self, pool):
+        self.pool = pool
+        self.profiles = {}
+        self.lock = threading.Lock()
+
+    def init_schema(self):
+        with self.pool.connection() as conn:
+            conn.execute(CREATE_USERS)
+
+    def get_password_hash(self, username):
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_PASSWORD, (username,)).fetchone()
+        return row[0] if row else None
+
+    def create_user(self, username, password_hash, name, phone, guardian_name, guardian_phone):
+        # Raises sqlite3.IntegrityError if the username is taken
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_USER, (username, password_hash, name, phone, guardian_name, guardian_phone))
+        self.invalidate(username)
+
+    def get_profile(self, username):
+        with self.lock:
+            if username in self.profiles:
+                return self.profiles[username]
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_PROFILE, (username,)).fetchone()
+        profile = UserProfile(*row) if row else None
+        if profile is not None:
+            with self.lock:
+                self.profiles[username] = profile
+        return profile
+
+    def update_profile(self, username, phone, guardian_name, guardian_phone, password_hash=None):
+        with self.pool.connection() as conn:
+            if password_hash:
+                conn.execute(UPDATE_PROFILE_AND_PASSWORD, (phone, guardian_name, guardian_phone, password_hash, username))
+            else:
+                conn.execute(UPDATE_PROFILE, (phone, guardian_name, guardian_phone, username))
+        self.invalidate(username)
+
+    def update_password(self, username, password_hash):
+        with self.pool.connection() as conn:
+            conn.execute(UPDATE_PASSWORD, (password_hash, username))
+
+    def invalidate(self, username):
+        with self.lock:
+            self.profiles.pop(username, None)
+
+
+_pool = None
+_users = None
+_lock = threading.Lock()
+
+
+def get_pool():
+    global _pool
+    with _lock:
+        if _pool is None:
+            _pool = ConnectionPool()
+        return _pool
+
+
+def get_user_repository():
+    global _users
+    pool = get_pool()
+    with _lock:
+        if _users is None:
+            _users = UserRepository(pool)
+        return _users
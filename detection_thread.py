@@ -1,105 +1,284 @@
 import cv2
 import time
 import sys
+import threading
 import numpy as np
+from concurrent.futures import ThreadPoolExecutor
 from PyQt5.QtCore import QThread, pyqtSignal
-from ultralytics import YOLO
-from utils import eye_aspect_ratio, log_distraction
-from config import (WEIGHTS_FILE, EYE_AR_THRESHOLD, EYE_CLOSED_DURATION, 
-                   MOBILE_PHONE_THRESHOLD, ALERT_COOLDOWN, LOG_DIR, LEFT_EYE, RIGHT_EYE)
+from ear import landmarks_to_points, mean_ear
+from config import (EYE_AR_THRESHOLD, EYE_CLOSED_DURATION, 
+                   MOBILE_PHONE_THRESHOLD, MOBILE_PHONE_DURATION, ALERT_COOLDOWN, LOG_DIR,
+                   TARGET_FPS, PIPELINE_QUEUE_SIZE, DETECTION_EXECUTION_MODE)
 import os
 import datetime
 from messaging import notify_guardian
+from pipeline import LatestFrameQueue, FramePacer
+from phone_scheduler import PhoneDetectionScheduler
+from frame_transport import FrameRing
+from face_tracker import FaceROITracker
+from evidence_writer import EvidenceWriter
+from event_store import get_event_store, EventRecorder
+from models import get_models
 
 class DetectionThread(QThread):
-    frame_signal = pyqtSignal(np.ndarray)
     alert_signal = pyqtSignal(str, np.ndarray)
+    event_recorded = pyqtSignal(str)  # Username, emitted once the event is in the event store
 
-    def __init__(self, model, face_mesh, username):
+    def __init__(self, models, username=None):
         super().__init__()
         self.running = True
         self.cap = cv2.VideoCapture(0)
-        self.model = model
-        self.face_mesh = face_mesh
-        self.username = username  # Store username for notifications
+        # Resolved from the registry when the thread starts, so the GUI never waits for them
+        self.models = models
+        self.detector = None
+        self.face_mesh = None
+        self.username = username  # Store username for notifications; None pauses detection
+        # Held while a frame is processed so a user switch never lands mid-frame
+        self.session_lock = threading.Lock()
         if not self.cap.isOpened():
             print("Error: Could not open camera.")
             sys.exit(1)
         self.eye_closed_start_time = None
-        self.mobile_phone_counter = 0
+        self.phone_first_seen_time = None
+        self.phone_passes = 0
         self.last_alert_time = 0
+        self.phone_scheduler = PhoneDetectionScheduler()
+        self.last_detection = None
+        self.face_tracker = FaceROITracker()
+        self.frame_ring = FrameRing()
+        # Single-slot mailbox the GUI polls; a frame it never picked up is counted as dropped
+        self.display_queue = LatestFrameQueue(1)
+        self.frames_produced = 0
+        self.frames_displayed = 0
+        # Capture -> inference -> render, each stage only ever sees the newest frame
+        self.capture_queue = LatestFrameQueue(PIPELINE_QUEUE_SIZE)
+        self.render_queue = LatestFrameQueue(PIPELINE_QUEUE_SIZE)
+        self.frame_id = 0
+        if DETECTION_EXECUTION_MODE == "parallel":
+            self.executor = ThreadPoolExecutor(max_workers=2, thread_name_prefix="detector")
+        else:
+            self.executor = None
         os.makedirs(LOG_DIR, exist_ok=True)
+        # Event rows and snapshots are both written off the inference thread
+        self.event_recorder = EventRecorder(get_event_store(), self.event_recorded.emit)
+        self.evidence_writer = EvidenceWriter(self.event_recorder)
 
-    def log_event(self, event_type, frame):
+    def log_event(self, event_type, frame, confidence=None):
         timestamp = datetime.datetime.now().strftime("%Y-%m-%d_%H-%M-%S")
-        log_file = os.path.join(LOG_DIR, "distraction_log.txt")
         img_path = os.path.join(LOG_DIR, f"{event_type}_{timestamp}.jpg")
-        
-        cv2.imwrite(img_path, frame)
-        with open(log_file, "a") as f:
-            f.write(f"{timestamp} - {event_type} detected - Image: {img_path}\n")
+
+        # The event is always recorded; only the snapshot's encoding and disk write are
+        # left to the evidence writer's workers, which may drop it under load
+        self.event_recorder.record(self.username, event_type, timestamp, confidence, img_path)
+        self.evidence_writer.submit(event_type, frame, timestamp, img_path)
         print(f"[LOG] {event_type} logged at {timestamp}")
         
         # Notify guardian
         notify_guardian(self.username, event_type, timestamp)
 
-    def run(self):
+    def capture_loop(self):
         while self.running and self.cap.isOpened():
             ret, frame = self.cap.read()
             if not ret:
                 print("Error: Failed to capture frame.")
+                self.running = False
                 break
+            self.frame_id += 1
+            self.capture_queue.put((self.frame_id, frame))
+        self.capture_queue.close()
+
+    def inference_loop(self):
+        while self.running:
+            item = self.capture_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, frame = item
+            with self.session_lock:
+                if self.username is None:
+                    continue  # Between sessions the camera stays open but nothing is analysed
+                detection = self.process_frame(frame)
+            self.render_queue.put((frame_id, frame, detection))
+        self.render_queue.close()
+
+    def detect_phone(self, frame):
+        detection = self.detector.detect(frame)
+        if detection.found:
+            print(f"[DEBUG] Cell phone detected with confidence: {detection.confidence:.2f}")
+        return detection
+
+    def detect_eyes(self, frame):
+        # Returns the mean eye aspect ratio, or None when no face is visible.
+        # Only the region around the last known face is converted and meshed.
+        face_region, origin = self.face_tracker.crop(frame)
+        rgb_frame = cv2.cvtColor(face_region, cv2.COLOR_BGR2RGB)
+        results_mesh = self.face_mesh.process(rgb_frame)
+        face_landmarks = results_mesh.multi_face_landmarks[0] if results_mesh.multi_face_landmarks else None
+        was_tracking = self.face_tracker.tracking
+        self.face_tracker.update(face_landmarks, origin, face_region.shape, frame.shape)
+        if face_landmarks is None:
+            # Tracking lost: retry this frame in full before reporting no face
+            return self.detect_eyes(frame) if was_tracking else None
+        # EAR is a ratio, so crop pixel coordinates work as well as full-frame ones
+        h, w, _ = face_region.shape
+        return mean_ear(landmarks_to_points(face_landmarks, w, h))
+
+    def process_frame(self, frame):
+        # Full YOLO only runs when the scheduler asks for it; otherwise the last
+        # phone result is carried forward and only FaceMesh sees this frame
+        now = time.time()
+        run_yolo = self.phone_scheduler.should_run(frame, now)
+        if run_yolo and self.executor is not None:
+            # YOLO and FaceMesh are independent, so run both on the same frame at once
+            phone_future = self.executor.submit(self.detect_phone, frame)
+            eyes_future = self.executor.submit(self.detect_eyes, frame)
+            detection = phone_future.result()
+            ear = eyes_future.result()
+        elif run_yolo:
+            detection = self.detect_phone(frame)
+            ear = self.detect_eyes(frame)
+        else:
+            detection = self.last_detection
+            ear = self.detect_eyes(frame)
+        if run_yolo:
+            self.phone_scheduler.record(detection.found, now)
+            self.last_detection = detection
+        self.update_state(frame, detection, ear, run_yolo)
+        return detection
 
-            results = self.model(frame)
-            phone_detected = False
-            for result in results:
-                for box in result.boxes:
-                    label = result.names[int(box.cls[0])]
-                    if label.lower() == "cell phone":
-                        phone_detected = True
-                        print(f"[DEBUG] Cell phone detected with confidence: {box.conf[0]}")
-                        break
-            if phone_detected:
-                self.mobile_phone_counter += 1
-            else:
-                self.mobile_phone_counter = 0
-
-            if self.mobile_phone_counter >= MOBILE_PHONE_THRESHOLD:
+    def update_state(self, frame, detection, ear, fresh=True):
+        # A phone alert needs MOBILE_PHONE_THRESHOLD consecutive YOLO passes that saw
+        # a phone, spanning at least MOBILE_PHONE_DURATION seconds. Frames that reuse
+        # an earlier result (fresh=False) do not count as passes.
+        if detection.found:
+            if self.phone_first_seen_time is None:
+                self.phone_first_seen_time = time.time()
+            if fresh:
+                self.phone_passes += 1
+            if (self.phone_passes >= MOBILE_PHONE_THRESHOLD
+                    and time.time() - self.phone_first_seen_time >= MOBILE_PHONE_DURATION):
                 if time.time() - self.last_alert_time > ALERT_COOLDOWN:
                     self.alert_signal.emit("Put your phone away and focus!", frame)
-                    self.log_event("Mobile Phone", frame)
+                    self.log_event("Mobile Phone", frame, detection.confidence)
                     self.last_alert_time = time.time()
-                    self.mobile_phone_counter = 0
-
-            rgb_frame = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-            results_mesh = self.face_mesh.process(rgb_frame)
-            if results_mesh.multi_face_landmarks:
-                for face_landmarks in results_mesh.multi_face_landmarks:
-                    h, w, _ = frame.shape
-                    left_eye = [(int(face_landmarks.landmark[i].x * w), int(face_landmarks.landmark[i].y * h)) 
-                                for i in LEFT_EYE]
-                    right_eye = [(int(face_landmarks.landmark[i].x * w), int(face_landmarks.landmark[i].y * h)) 
-                                 for i in RIGHT_EYE]
-                    ear = (eye_aspect_ratio(left_eye) + eye_aspect_ratio(right_eye)) / 2.0
-                    if ear < EYE_AR_THRESHOLD:
-                        if self.eye_closed_start_time is None:
-                            self.eye_closed_start_time = time.time()
-                        elif time.time() - self.eye_closed_start_time >= EYE_CLOSED_DURATION:
-                            if time.time() - self.last_alert_time > ALERT_COOLDOWN:
-                                self.alert_signal.emit("Wake up! You are dozing off!", frame)
-                                self.log_event("Dozing", frame)
-                                self.last_alert_time = time.time()
-                                self.eye_closed_start_time = None
-                    else:
-                        self.eye_closed_start_time = None
-            else:
-                print("[DEBUG] No face detected")
-
-            self.frame_signal.emit(results[0].plot())
-            time.sleep(0.033)
+                    self.phone_first_seen_time = None
+                    self.phone_passes = 0
+        else:
+            self.phone_first_seen_time = None
+            self.phone_passes = 0
 
+        if ear is None:
+            print("[DEBUG] No face detected")
+        elif ear < EYE_AR_THRESHOLD:
+            if self.eye_closed_start_time is None:
+                self.eye_closed_start_time = time.time()
+            elif time.time() - self.eye_closed_start_time >= EYE_CLOSED_DURATION:
+                if time.time() - self.last_alert_time > ALERT_COOLDOWN:
+                    self.alert_signal.emit("Wake up! You are dozing off!", frame)
+                    self.log_event("Dozing", frame)
+                    self.last_alert_time = time.time()
+                    self.eye_closed_start_time = None
+        else:
+            self.eye_closed_start_time = None
+
+    def load_models(self):
+        # Usually instant: the registry started loading these during login
+        try:
+            self.detector = self.models.get("detector")
+            self.face_mesh = self.models.get("face_mesh")
+            return True
+        except RuntimeError as e:
+            print(f"[ERROR] {e}")
+            return False
+
+    def run(self):
+        if self.load_models():
+            self.run_pipeline()
+        else:
+            self.running = False
+        if self.executor is not None:
+            self.executor.shutdown(wait=True)
+        self.evidence_writer.close()
+        self.event_recorder.close()
         self.cap.release()
 
+    def run_pipeline(self):
+        # This QThread is the render stage; capture and inference run alongside it
+        stages = [threading.Thread(target=self.capture_loop, daemon=True),
+                  threading.Thread(target=self.inference_loop, daemon=True)]
+        for stage in stages:
+            stage.start()
+
+        pacer = FramePacer(TARGET_FPS)
+        while self.running:
+            item = self.render_queue.get(timeout=0.1)
+            if item is None:
+                continue
+            frame_id, frame, detection = item
+            # The detection may come from an earlier YOLO pass; it is drawn on the current frame
+            self.display_queue.put(self.frame_ring.publish(frame, detection))
+            self.frames_produced += 1
+            pacer.wait()
+
+        for stage in stages:
+            stage.join()
+
+    def bind_user(self, username):
+        # Hands the running service to another user; the camera, models and
+        # worker threads are kept, only the per-session state starts over
+        with self.session_lock:
+            self.username = username
+            self.eye_closed_start_time = None
+            self.phone_first_seen_time = None
+            self.phone_passes = 0
+            self.last_alert_time = 0
+            self.phone_scheduler = PhoneDetectionScheduler()
+            self.last_detection = None
+            self.face_tracker.reset()
+            self.display_queue.clear()  # Drop a frame rendered for the previous session, and its stats
+            self.frames_produced = 0
+            self.frames_displayed = 0
+
+    def unbind_user(self):
+        self.bind_user(None)
+
+    def take_frame(self):
+        # Called from the GUI refresh timer; returns the newest frame or None if nothing new arrived
+        image = self.display_queue.get(timeout=0)
+        if image is not None:
+            self.frames_displayed += 1
+        return image
+
+    @property
+    def frames_dropped(self):
+        return self.display_queue.dropped
+
     def stop(self):
         self.running = False
-        self.wait()
\ No newline at end of file
+        self.capture_queue.close()
+        self.render_queue.close()
+        self.display_queue.close()
+        self.wait()
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_detection_service():
+    # One detection thread shared by every login session. If it has stopped (the camera
+    # failed or the models could not load) the next login starts a fresh one, which
+    # also asks the model registry to try loading again.
+    global _service
+    with _service_lock:
+        if _service is None or _service.isFinished():
+            _service = DetectionThread(get_models())
+            _service.start()
+        return _service
+
+
+def shutdown_detection_service():
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.stop()
+            _service = None
@@ -0,0 +1,144 @@
+import os
+import ast
+import cv2
+import numpy as np
+from config import (WEIGHTS_FILE, DETECTION_CLASSES, YOLO_IMAGE_SIZE, YOLO_CONFIDENCE,
+                    DETECTOR_BACKEND, DETECTOR_INT8)
+from utils import resolve_class_ids
+
+NMS_IOU_THRESHOLD = 0.45  # Same default ultralytics uses for its own NMS
+
+
+class PhoneDetection:
+    # Phone boxes found in one frame, as (N, 4) xyxy pixel coordinates
+    def __init__(self, boxes, confidences):
+        self.boxes = boxes
+        self.confidences = confidences
+
+    @property
+    def found(self):
+        return len(self.confidences) > 0
+
+    @property
+    def confidence(self):
+        return float(self.confidences.max()) if self.found else 0.0
+
+
+class PhoneDetector:
+    # Interface DetectionThread talks to; backends only differ in how the YOLO weights are run
+    name = None
+
+    def detect(self, frame):
+        raise NotImplementedError
+
+
+class TorchPhoneDetector(PhoneDetector):
+    name = "torch"
+
+    def __init__(self, weights=WEIGHTS_FILE):
+        from ultralytics import YOLO
+        self.model = YOLO(weights)
+        self.model.overrides['verbose'] = False
+        self.phone_class_id = resolve_class_ids(self.model.names, ["cell phone"])[0]
+        # Keyword arguments for every YOLO call: only the classes we care about, at a reduced input size
+        self.profile = {
+            "classes": resolve_class_ids(self.model.names, DETECTION_CLASSES),
+            "imgsz": YOLO_IMAGE_SIZE,
+            "conf": YOLO_CONFIDENCE,
+        }
+
+    def detect(self, frame):
+        boxes = self.model(frame, **self.profile)[0].boxes.cpu().numpy()
+        is_phone = boxes.cls == self.phone_class_id
+        return PhoneDetection(boxes.xyxy[is_phone], boxes.conf[is_phone])
+
+
+class OnnxPhoneDetector(PhoneDetector):
+    # Runs an ONNX export of the YOLO weights through ONNX Runtime, which is
+    # considerably faster than the PyTorch path on CPU-only machines
+    name = "onnx"
+
+    def __init__(self, weights=WEIGHTS_FILE, int8=DETECTOR_INT8, image_size=YOLO_IMAGE_SIZE):
+        try:
+            import onnxruntime as ort
+        except ImportError:
+            raise RuntimeError("The onnx detector backend needs onnxruntime: pip install -r requirements-onnx.txt")
+        self.image_size = image_size
+        self.onnx_path = export_onnx(weights, image_size, int8)
+        self.session = ort.InferenceSession(self.onnx_path, providers=["CPUExecutionProvider"])
+        self.input_name = self.session.get_inputs()[0].name
+        names = ast.literal_eval(self.session.get_modelmeta().custom_metadata_map["names"])
+        self.phone_class_id = resolve_class_ids(names, ["cell phone"])[0]
+
+    def letterbox(self, frame):
+        # Resize keeping aspect ratio and pad to a square, as ultralytics does
+        h, w = frame.shape[:2]
+        scale = min(self.image_size / h, self.image_size / w)
+        new_w, new_h = round(w * scale), round(h * scale)
+        pad_x, pad_y = (self.image_size - new_w) // 2, (self.image_size - new_h) // 2
+        canvas = np.full((self.image_size, self.image_size, 3), 114, dtype=np.uint8)
+        canvas[pad_y:pad_y + new_h, pad_x:pad_x + new_w] = cv2.resize(frame, (new_w, new_h), interpolation=cv2.INTER_LINEAR)
+        return canvas, scale, pad_x, pad_y
+
+    def detect(self, frame):
+        canvas, scale, pad_x, pad_y = self.letterbox(frame)
+        blob = cv2.dnn.blobFromImage(canvas, 1 / 255.0, swapRB=True)
+        # Output is (1, 4 + classes, anchors): cx, cy, w, h followed by per-class scores
+        output = self.session.run(None, {self.input_name: blob})[0][0]
+        scores = output[4 + self.phone_class_id]
+        keep = scores >= YOLO_CONFIDENCE
+        if not keep.any():
+            return PhoneDetection(np.empty((0, 4), dtype=np.float32), np.empty(0, dtype=np.float32))
+        cx, cy, bw, bh = output[:4, keep]
+        scores = scores[keep]
+        xywh = np.stack([cx - bw / 2, cy - bh / 2, bw, bh], axis=1)
+        indices = np.asarray(cv2.dnn.NMSBoxes(xywh.tolist(), scores.tolist(), YOLO_CONFIDENCE, NMS_IOU_THRESHOLD), dtype=int).reshape(-1)
+        xywh, scores = xywh[indices], scores[indices]
+        boxes = np.stack([xywh[:, 0], xywh[:, 1], xywh[:, 0] + xywh[:, 2], xywh[:, 1] + xywh[:, 3]], axis=1)
+        boxes -= [pad_x, pad_y, pad_x, pad_y]
+        boxes /= scale
+        h, w = frame.shape[:2]
+        np.clip(boxes, 0, [w, h, w, h], out=boxes)
+        return PhoneDetection(boxes.astype(np.float32), scores.astype(np.float32))
+
+
+def export_onnx(weights=WEIGHTS_FILE, image_size=YOLO_IMAGE_SIZE, int8=False):
+    # Exports are cached next to the .pt weights, e.g. yolov8n_320.onnx / yolov8n_320_int8.onnx,
+    # and redone whenever the weights are newer than the cached file
+    stem = os.path.splitext(weights)[0]
+    fp32_path = f"{stem}_{image_size}.onnx"
+    if not os.path.exists(fp32_path) or os.path.getmtime(fp32_path) < os.path.getmtime(weights):
+        from ultralytics import YOLO
+        print(f"[DEBUG] Exporting {weights} to ONNX at {image_size}px...")
+        exported = YOLO(weights).export(format="onnx", imgsz=image_size, dynamic=False)
+        os.replace(exported, fp32_path)
+    if not int8:
+        return fp32_path
+
+    int8_path = f"{stem}_{image_size}_int8.onnx"
+    if not os.path.exists(int8_path) or os.path.getmtime(int8_path) < os.path.getmtime(fp32_path):
+        from onnxruntime.quantization import quantize_dynamic, QuantType
+        print(f"[DEBUG] Quantizing {fp32_path} to INT8...")
+        quantize_dynamic(fp32_path, int8_path, weight_type=QuantType.QUInt8)
+    return int8_path
+
+
+BACKENDS = {
+    TorchPhoneDetector.name: TorchPhoneDetector,
+    OnnxPhoneDetector.name: OnnxPhoneDetector,
+}
+
+
+def create_detector(backend=DETECTOR_BACKEND):
+    if backend not in BACKENDS:
+        raise ValueError(f"Unknown detector backend '{backend}', expected one of: {', '.join(BACKENDS)}")
+    return BACKENDS[backend]()
+
+
+def draw_detection(frame, detection, scale=1.0):
+    # Draws in place; scale maps detection coordinates onto a resized frame
+    for (x1, y1, x2, y2), conf in zip((detection.boxes * scale).astype(int), detection.confidences):
+        cv2.rectangle(frame, (x1, y1), (x2, y2), (0, 0, 255), 2)
+        cv2.putText(frame, f"cell phone {conf:.2f}", (x1, max(y1 - 8, 12)),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.5, (0, 0, 255), 2)
+    return frame
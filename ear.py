@@ -0,0 +1,43 @@
+import numpy as np
+from config import LEFT_EYE, RIGHT_EYE
+
+# Landmark indices for both eyes, gathered together so one pass pulls every point we need
+EYE_INDICES = np.array([LEFT_EYE, RIGHT_EYE])  # (2 eyes, 6 points)
+_FLAT_INDICES = EYE_INDICES.ravel().tolist()
+# Point pairs per eye: the two vertical distances, then the horizontal one
+_PAIR_FROM = [1, 2, 0]
+_PAIR_TO = [5, 4, 3]
+
+
+def landmarks_to_points(face_landmarks, width, height):
+    # FaceMesh landmarks -> (2, 6, 2) pixel coordinates for the left and right eye
+    landmark = face_landmarks.landmark
+    coords = np.array([(landmark[i].x, landmark[i].y) for i in _FLAT_INDICES])
+    coords *= (width, height)
+    return coords.reshape(EYE_INDICES.shape + (2,))
+
+
+def eye_aspect_ratios(eyes):
+    # eyes: (..., 6, 2) points ordered like LEFT_EYE/RIGHT_EYE -> (...) EAR per eye.
+    # EAR = (|p1-p5| + |p2-p4|) / (2 |p0-p3|), computed for every leading index at once
+    diff = eyes[..., _PAIR_FROM, :] - eyes[..., _PAIR_TO, :]
+    dist = np.sqrt(np.einsum('...i,...i->...', diff, diff))
+    return (dist[..., 0] + dist[..., 1]) / (2.0 * dist[..., 2])
+
+
+def mean_ear(points):
+    # (2, 6, 2) eye points for one face -> EAR averaged over both eyes
+    left, right = eye_aspect_ratios(points)
+    return float(left + right) / 2.0
+
+
+def batch_mean_ear(points_batch):
+    # (frames, 2, 6, 2) eye points -> (frames,) mean EAR, for offline analysis of recordings
+    return eye_aspect_ratios(np.asarray(points_batch, dtype=np.float64)).mean(axis=-1)
+
+
+def batch_landmarks_to_points(faces, width, height):
+    # Stacks landmarks_to_points over many frames into a (frames, 2, 6, 2) array
+    if not faces:
+        return np.empty((0,) + EYE_INDICES.shape + (2,))
+    return np.stack([landmarks_to_points(face, width, height) for face in faces])
@@ -0,0 +1,174 @@
+import os
+import re
+import time
+import queue
+import threading
+import datetime
+from collections import namedtuple
+from config import LEGACY_LOG_FILE
+from database import get_pool
+
+TIMESTAMP_FORMAT = "%Y-%m-%d_%H-%M-%S"  # Format used in evidence filenames and the legacy log
+
+Event = namedtuple("Event", ["id", "username", "event_type", "occurred_at", "confidence", "image_path"])
+
+INSERT_EVENT = "INSERT INTO events (username, event_type, occurred_at, confidence, image_path) VALUES (?, ?, ?, ?, ?)"
+CREATE_EVENTS = '''CREATE TABLE IF NOT EXISTS events
+                   (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, event_type TEXT NOT NULL,
+                    occurred_at REAL NOT NULL, confidence REAL, image_path TEXT)'''
+
+# Events imported from the legacy log belong to no user and are only returned with include_legacy=True
+USER_ONLY = "username = ?"
+USER_OR_LEGACY = "(username = ? OR username IS NULL)"
+
+LEGACY_LINE = re.compile(r"^(?P<timestamp>\d{4}-\d{2}-\d{2}_\d{2}-\d{2}-\d{2}) - (?P<event_type>.+?) detected - Image: (?P<image_path>.+)$")
+
+
+def to_epoch(value):
+    if isinstance(value, datetime.datetime):
+        return value.timestamp()
+    if isinstance(value, str):
+        return datetime.datetime.strptime(value, TIMESTAMP_FORMAT).timestamp()
+    return float(value)
+
+
+class EventStore:
+    # Distraction events in an indexed SQLite table. Range queries by user and
+    # time go through the (username, occurred_at) index instead of re-reading
+    # a text log. Times are stored as epoch seconds.
+    def __init__(self, pool):
+        self.pool = pool
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT sql FROM sqlite_master WHERE type = 'table' AND name = 'events'").fetchone()
+            if row and "UNIQUE" in row[0]:
+                # Earlier builds made image_path unique, which silently dropped events sharing a snapshot name
+                conn.execute("ALTER TABLE events RENAME TO events_old")
+                conn.execute(CREATE_EVENTS)
+                conn.execute("INSERT INTO events SELECT id, username, event_type, occurred_at, confidence, image_path "
+                             "FROM events_old")
+                conn.execute("DROP TABLE events_old")
+            conn.execute(CREATE_EVENTS)
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_events_user_time ON events (username, occurred_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS imported_logs (path TEXT PRIMARY KEY, imported_at REAL, events INTEGER)")
+
+    def record(self, username, event_type, occurred_at, confidence=None, image_path=None):
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_EVENT, (username, event_type, to_epoch(occurred_at), confidence, image_path))
+
+    def clear_image(self, image_path):
+        # For an event whose snapshot was never written
+        with self.pool.connection() as conn:
+            conn.execute("UPDATE events SET image_path = NULL WHERE image_path = ?", (image_path,))
+
+    def events_between(self, username, start, end, event_type=None, limit=None, newest_first=False,
+                       include_legacy=False):
+        query = "SELECT id, username, event_type, occurred_at, confidence, image_path FROM events " \
+                f"WHERE {USER_OR_LEGACY if include_legacy else USER_ONLY} AND occurred_at >= ? AND occurred_at < ?"
+        params = [username, to_epoch(start), to_epoch(end)]
+        if event_type is not None:
+            query += " AND event_type = ?"
+            params.append(event_type)
+        query += " ORDER BY occurred_at DESC" if newest_first else " ORDER BY occurred_at"
+        if limit is not None:
+            query += " LIMIT ?"
+            params.append(limit)
+        with self.pool.connection() as conn:
+            return [Event(*row) for row in conn.execute(query, params)]
+
+    def recent_events(self, username, limit=5, include_legacy=False):
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT id, username, event_type, occurred_at, confidence, image_path FROM events "
+                                f"WHERE {USER_OR_LEGACY if include_legacy else USER_ONLY} "
+                                "ORDER BY occurred_at DESC LIMIT ?", (username, limit)).fetchall()
+        return [Event(*row) for row in rows]
+
+    def count_by_type(self, username, start, end, include_legacy=False):
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT event_type, COUNT(*) FROM events "
+                                f"WHERE {USER_OR_LEGACY if include_legacy else USER_ONLY} "
+                                "AND occurred_at >= ? AND occurred_at < ? GROUP BY event_type",
+                                (username, to_epoch(start), to_epoch(end))).fetchall()
+        return dict(rows)
+
+    def import_text_log(self, log_file=LEGACY_LOG_FILE, username=None):
+        # One-time import of the old free-text log. The old log never recorded a
+        # user, so events are stored under `username` (None unless given) and are
+        # not part of any student's log. The file is left in place; the
+        # imported_logs table records that it has been read.
+        if not os.path.exists(log_file):
+            return 0
+        path = os.path.abspath(log_file)
+        with self.pool.connection() as conn:
+            if conn.execute("SELECT 1 FROM imported_logs WHERE path = ?", (path,)).fetchone():
+                return 0
+        rows, seen = [], set()
+        with open(log_file) as f:
+            for line in f:
+                match = LEGACY_LINE.match(line.strip())
+                if not match:
+                    continue
+                # Older logs were written on Windows with backslash separators
+                image_path = os.path.join(*re.split(r"[\\/]", match["image_path"]))
+                # The log may repeat a line; imported_logs keeps the file from being read twice
+                if image_path in seen:
+                    continue
+                seen.add(image_path)
+                rows.append((username, match["event_type"], to_epoch(match["timestamp"]), None, image_path))
+        with self.pool.connection() as conn:
+            conn.executemany(INSERT_EVENT, rows)
+            imported = len(rows)
+            conn.execute("INSERT INTO imported_logs (path, imported_at, events) VALUES (?, ?, ?)",
+                         (path, time.time(), imported))
+        print(f"[LOG] Imported {imported} events from {log_file}")
+        return imported
+
+
+class EventRecorder:
+    # Writes events on a thread of its own so the detection loop never waits on
+    # SQLite. Jobs run in the order they were queued, so an event is always
+    # inserted before its snapshot can be unlinked. The queue is unbounded:
+    # events are rare and none may be lost. on_recorded(username) is called
+    # on this thread once an event is committed.
+    def __init__(self, event_store, on_recorded=None):
+        self.event_store = event_store
+        self.on_recorded = on_recorded
+        self.jobs = queue.Queue()
+        self.worker = threading.Thread(target=self.run, name="event-recorder", daemon=True)
+        self.worker.start()
+
+    def record(self, username, event_type, occurred_at, confidence=None, image_path=None):
+        self.jobs.put((self.event_store.record, (username, event_type, occurred_at, confidence, image_path), username))
+
+    def clear_image(self, image_path):
+        self.jobs.put((self.event_store.clear_image, (image_path,), None))
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                break
+            write, args, username = job
+            try:
+                write(*args)
+                if username is not None and self.on_recorded is not None:
+                    self.on_recorded(username)
+            except Exception as e:
+                print(f"[ERROR] Failed to write event: {e}")
+
+    def close(self):
+        # Finishes whatever is queued before returning
+        self.jobs.put(None)
+        self.worker.join()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_event_store():
+    global _store
+    with _store_lock:
+        if _store is None:
+            _store = EventStore(get_pool())
+            _store.import_text_log()
+        return _store
@@ -0,0 +1,88 @@
+import queue
+import threading
+import time
+import cv2
+from config import EVIDENCE_JPEG_QUALITY, EVIDENCE_MAX_WIDTH, EVIDENCE_WORKERS, EVIDENCE_QUEUE_SIZE
+
+
+class EvidenceWriter:
+    # Saves distraction snapshots off the detection thread. Frames
+    # go through a bounded queue to a small pool of encoder threads (cv2 releases
+    # the GIL while encoding); if the pool falls behind new evidence is dropped
+    # rather than stalling detection. The event itself goes through the event
+    # recorder; a snapshot that is dropped or fails to save is unlinked from it.
+    def __init__(self, recorder, quality=EVIDENCE_JPEG_QUALITY, max_width=EVIDENCE_MAX_WIDTH,
+                 workers=EVIDENCE_WORKERS, queue_size=EVIDENCE_QUEUE_SIZE):
+        self.recorder = recorder
+        self.quality = quality
+        self.max_width = max_width
+        self.jobs = queue.Queue(maxsize=queue_size)
+        self.written = 0
+        self.dropped = 0
+        self.total_encode_time = 0.0
+        self.last_encode_time = 0.0
+        self.lock = threading.Lock()  # Guards the counters, updated from every worker
+        self.workers = [threading.Thread(target=self.run, name=f"evidence-{i}", daemon=True) for i in range(workers)]
+        for worker in self.workers:
+            worker.start()
+
+    def submit(self, event_type, frame, timestamp, img_path):
+        try:
+            self.jobs.put_nowait((event_type, frame, timestamp, img_path))
+            return True
+        except queue.Full:
+            with self.lock:
+                self.dropped += 1
+            print(f"[ERROR] Evidence queue full, dropped {event_type} snapshot at {timestamp}")
+            self.recorder.clear_image(img_path)
+            return False
+
+    def encode(self, frame):
+        h, w = frame.shape[:2]
+        if self.max_width and w > self.max_width:
+            frame = cv2.resize(frame, (self.max_width, int(h * self.max_width / w)), interpolation=cv2.INTER_AREA)
+        ok, data = cv2.imencode(".jpg", frame, [cv2.IMWRITE_JPEG_QUALITY, self.quality])
+        if not ok:
+            raise RuntimeError("JPEG encoding failed")
+        return data
+
+    def run(self):
+        while True:
+            job = self.jobs.get()
+            if job is None:
+                self.jobs.task_done()
+                break
+            event_type, frame, timestamp, img_path = job
+            try:
+                start = time.perf_counter()
+                data = self.encode(frame)
+                elapsed = time.perf_counter() - start
+                with open(img_path, "wb") as f:
+                    f.write(data.tobytes())
+                with self.lock:
+                    self.last_encode_time = elapsed
+                    self.total_encode_time += elapsed
+                    self.written += 1
+            except Exception as e:
+                print(f"[ERROR] Failed to save evidence for {event_type} at {timestamp}: {e}")
+                self.recorder.clear_image(img_path)
+            finally:
+                self.jobs.task_done()
+
+    def stats(self):
+        with self.lock:
+            mean = self.total_encode_time / self.written if self.written else 0.0
+            return {
+                "queue_depth": self.jobs.qsize(),
+                "written": self.written,
+                "dropped": self.dropped,
+                "last_encode_ms": self.last_encode_time * 1000,
+                "mean_encode_ms": mean * 1000,
+            }
+
+    def close(self):
+        # Finishes whatever is queued before returning
+        for _ in self.workers:
+            self.jobs.put(None)
+        for worker in self.workers:
+            worker.join()
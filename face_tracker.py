@@ -0,0 +1,54 @@
+import numpy as np
+from config import FACE_ROI_MARGIN, FACE_ROI_MIN_SIZE
+
+# FaceMesh face-oval landmarks; their extent is a tight box around the face
+FACE_OVAL = [10, 338, 297, 332, 284, 251, 389, 356, 454, 323, 361, 288, 397, 365, 379, 378, 400, 377,
+             152, 148, 176, 149, 150, 136, 172, 58, 132, 93, 234, 127, 162, 21, 54, 103, 67, 109]
+
+
+class FaceROITracker:
+    # Crops each frame around the face found in the previous one, so colour
+    # conversion and FaceMesh only touch the region that matters. When no face
+    # was found the next frame is processed in full.
+    def __init__(self, margin=FACE_ROI_MARGIN, min_size=FACE_ROI_MIN_SIZE):
+        self.margin = margin
+        self.min_size = min_size
+        self.roi = None  # (x0, y0, x1, y1) in frame pixels
+        self.tracked_frames = 0
+        self.full_frames = 0
+
+    @property
+    def tracking(self):
+        return self.roi is not None
+
+    def crop(self, frame):
+        # Returns the region to run FaceMesh on and its (x, y) origin within the frame
+        if self.roi is None:
+            self.full_frames += 1
+            return frame, (0, 0)
+        self.tracked_frames += 1
+        x0, y0, x1, y1 = self.roi
+        return frame[y0:y1, x0:x1], (x0, y0)
+
+    def update(self, face_landmarks, origin, crop_shape, frame_shape):
+        # face_landmarks are normalised to the crop; store the next ROI in frame pixels
+        if face_landmarks is None:
+            self.roi = None
+            return
+        crop_h, crop_w = crop_shape[:2]
+        frame_h, frame_w = frame_shape[:2]
+        landmark = face_landmarks.landmark
+        xy = np.array([(landmark[i].x, landmark[i].y) for i in FACE_OVAL])
+        xy *= (crop_w, crop_h)
+        xy += origin
+        (x0, y0), (x1, y1) = xy.min(axis=0), xy.max(axis=0)
+        pad = self.margin * max(x1 - x0, y1 - y0)
+        x0, y0 = max(int(x0 - pad), 0), max(int(y0 - pad), 0)
+        x1, y1 = min(int(x1 + pad), frame_w), min(int(y1 + pad), frame_h)
+        if x1 - x0 < self.min_size or y1 - y0 < self.min_size:
+            self.roi = None
+        else:
+            self.roi = (x0, y0, x1, y1)
+
+    def reset(self):
+        self.roi = None
@@ -0,0 +1,44 @@
+import cv2
+import numpy as np
+from PyQt5.QtGui import QImage
+from config import DISPLAY_SIZE, FRAME_RING_SLOTS
+from detectors import draw_detection
+
+
+class FrameRing:
+    # Hands display-ready frames to the GUI without per-frame allocations. Each
+    # frame is resized straight into the next preallocated buffer, overlays are
+    # drawn on that buffer in place, and a QImage is wrapped around it without
+    # copying. Buffers stay BGR and are exposed as Format_BGR888, so no colour
+    # conversion pass is needed either. The GUI thread only has to turn the
+    # QImage into a pixmap.
+    def __init__(self, display_size=DISPLAY_SIZE, slots=FRAME_RING_SLOTS):
+        self.display_size = display_size
+        self.slots = slots
+        self.buffers = []
+        self.source_shape = None
+        self.scale = 1.0
+        self.index = 0
+
+    def allocate(self, frame_shape):
+        # Fit the camera frame into the display area keeping its aspect ratio
+        h, w = frame_shape[:2]
+        self.scale = min(self.display_size[0] / w, self.display_size[1] / h)
+        size = (max(int(h * self.scale), 1), max(int(w * self.scale), 1), 3)
+        self.buffers = [np.empty(size, dtype=np.uint8) for _ in range(self.slots)]
+        self.source_shape = frame_shape
+
+    def publish(self, frame, detection=None):
+        if frame.shape != self.source_shape:
+            self.allocate(frame.shape)
+        buffer = self.buffers[self.index]
+        self.index = (self.index + 1) % self.slots
+        h, w = buffer.shape[:2]
+        cv2.resize(frame, (w, h), dst=buffer, interpolation=cv2.INTER_AREA)
+        if detection is not None:
+            draw_detection(buffer, detection, self.scale)
+        image = QImage(buffer.data, w, h, buffer.strides[0], QImage.Format_BGR888)
+        # QImage does not own the memory; keep the buffer alive with the image, since a
+        # resolution change replaces the ring while the GUI may still hold this frame
+        image.buffer = buffer
+        return image
@@ -1,29 +1,59 @@
 import os
-import json
-import cv2
+import time
+import datetime
 from PyQt5.QtWidgets import (QMainWindow, QWidget, QVBoxLayout, QHBoxLayout, QPushButton, QLabel, QFileDialog,
                              QScrollArea, QGroupBox, QRadioButton, QButtonGroup, QDialog, QFrame, QSizePolicy,
-                             QTextEdit, QProgressBar)
+                             QTextEdit, QProgressBar, QSpinBox, QLineEdit, QListWidget, QListWidgetItem)
 from PyQt5.QtCore import Qt, QTimer, QPropertyAnimation, QEasingCurve, QRect, QTime
-from PyQt5.QtGui import QImage, QPixmap, QFont
-import PyPDF2
+from PyQt5.QtGui import QPixmap, QFont, QTextCursor
+from PyQt5 import sip
 from reportlab.lib.pagesizes import letter
 from reportlab.platypus import SimpleDocTemplate, Paragraph
 from reportlab.lib.styles import getSampleStyleSheet
-from detection_thread import DetectionThread
-import google.generativeai as genai
-from config import GOOGLE_API_KEY
+from detection_thread import get_detection_service
+from config import DISPLAY_FPS, QUIZ_DEFAULT_QUESTIONS
 from profile_manager import ProfileManager
+from speech import get_speech_service
+from event_store import get_event_store
+from models import get_models
+from pdf_ingest import PdfIngestWorker
+from llm import create_llm_client
+from summarizer import Summarizer, SummaryWorker
+from quiz_engine import QuizEngine, QuizWorker
+from question_bank import get_question_bank
+from notes_index import IndexStore, retrieve
+from notes_library import get_notes_library
+
+_active_window = None
+# Cancelled workers still finishing; kept here so they outlive the window that started them
+_retired_workers = []
+
+
+def show_main_window(username):
+    # The app has one main window at a time. The previous one is handed over to Qt
+    # and deleted once control is back in the event loop, so nothing keeps it alive.
+    global _active_window
+    previous = _active_window
+    _active_window = StudyAssistantWindow(username)
+    _active_window.show()
+    if previous is not None:
+        sip.transferto(previous, None)
+        previous.deleteLater()
+    return _active_window
+
 
 class StudyAssistantWindow(QMainWindow):
     def __init__(self, username):
         super().__init__()
         self.username = username
+        self.retired_workers = _retired_workers
         self.setWindowTitle(f"Study Buddy - {self.username}")
         self.setFixedSize(1200, 800)
         self.init_ui()
         self.setup_detection_thread()
         self.setup_styles()
+        self.refresh_event_log()
+        self.load_library()
 
     def init_ui(self):
         self.central_widget = QWidget()
@@ -84,6 +114,9 @@ class StudyAssistantWindow(QMainWindow):
         self.log_label = QLabel("Distraction Log:\nNo distractions yet.")
         self.log_label.setWordWrap(True)
         self.focus_layout.addWidget(self.log_label, stretch=0)
+        self.stats_label = QLabel("Frames: 0 produced · 0 displayed · 0 dropped")
+        self.stats_label.setAlignment(Qt.AlignRight)
+        self.focus_layout.addWidget(self.stats_label, stretch=0)
         self.focus_layout.addStretch()
 
         # Notes
@@ -91,23 +124,43 @@ class StudyAssistantWindow(QMainWindow):
         self.upload_btn = QPushButton("📤 Upload Notes")
         self.upload_btn.clicked.connect(self.upload_pdf)
         self.notes_layout.addWidget(self.upload_btn, stretch=0)
+        # Every document the user has uploaded; summaries and quizzes use the ticked ones
+        self.library_label = QLabel("Your notes library - tick the documents to use")
+        self.notes_layout.addWidget(self.library_label, stretch=0)
+        self.library_list = QListWidget()
+        self.library_list.setMaximumHeight(140)
+        self.notes_layout.addWidget(self.library_list, stretch=0)
+        self.output_scroll = QScrollArea()
+        self.output_widget = QWidget()
+        self.output_layout = QVBoxLayout(self.output_widget)
+        self.output_layout.setContentsMargins(10, 10, 10, 10)
+        self.output_scroll.setWidget(self.output_widget)
+        self.output_scroll.setWidgetResizable(True)
         self.notes_layout.addWidget(self.output_scroll, stretch=4)
         self.output_scroll.setMinimumHeight(600)
+        self.topic_input = QLineEdit()
+        self.topic_input.setPlaceholderText("Focus on a topic (optional) - only the matching parts of the notes are used")
+        self.notes_layout.addWidget(self.topic_input, stretch=0)
         self.summary_btn = QPushButton("✨ Generate Summary")
         self.summary_btn.clicked.connect(self.generate_summary)
         self.notes_layout.addWidget(self.summary_btn, stretch=0)
+        quiz_row = QHBoxLayout()
         self.quiz_gen_btn = QPushButton("🎯 Generate Quiz for Quiz Tab")
         self.quiz_gen_btn.clicked.connect(self.generate_quiz)
-        self.notes_layout.addWidget(self.quiz_gen_btn, stretch=0)
+        quiz_row.addWidget(self.quiz_gen_btn, stretch=1)
+        self.quiz_count_spin = QSpinBox()
+        self.quiz_count_spin.setRange(1, 200)
+        self.quiz_count_spin.setValue(QUIZ_DEFAULT_QUESTIONS)
+        self.quiz_count_spin.setSuffix(" questions")
+        quiz_row.addWidget(self.quiz_count_spin, stretch=0)
+        self.notes_layout.addLayout(quiz_row, stretch=0)
         self.progress_bar = QProgressBar()
         self.progress_bar.setVisible(False)
         self.notes_layout.addWidget(self.progress_bar, stretch=0)
-        self.output_scroll = QScrollArea()
-        self.output_widget = QWidget()
-        self.output_layout = QVBoxLayout(self.output_widget)
-        self.output_layout.setContentsMargins(10, 10, 10, 10)
-        self.output_scroll.setWidget(self.output_widget)
-        self.output_scroll.setWidgetResizable(True)
+        self.cancel_summary_btn = QPushButton("✖ Cancel Summary")
+        self.cancel_summary_btn.clicked.connect(self.cancel_summary)
+        self.cancel_summary_btn.setVisible(False)
+        self.notes_layout.addWidget(self.cancel_summary_btn, stretch=0)
         self.notes_layout.addStretch()
 
         # Quiz
@@ -146,11 +199,19 @@ class StudyAssistantWindow(QMainWindow):
         self.current_content = page
 
     def setup_detection_thread(self):
-        from models import model, face_mesh, engine
-        self.detection_thread = DetectionThread(model, face_mesh, self.username)
-        self.detection_thread.frame_signal.connect(self.update_frame)
+        self.models = get_models()
+        self.speech = get_speech_service()
+        # The detection service outlives this window; logging in only rebinds it to the new user
+        self.detection_thread = get_detection_service()
+        self.detection_thread.bind_user(self.username)
         self.detection_thread.alert_signal.connect(self.show_alert)
-        self.detection_thread.start()
+        self.detection_thread.event_recorded.connect(self.on_event_recorded)
+        self.session_active = True
+
+        # The GUI pulls the newest frame at its own pace instead of queueing every frame
+        self.frame_timer = QTimer(self)
+        self.frame_timer.timeout.connect(self.update_frame)
+        self.frame_timer.start(int(1000 / DISPLAY_FPS))
 
         self.alert_animation = QPropertyAnimation(self.alert_label, b"geometry")
         self.alert_animation.setDuration(300)
@@ -302,88 +363,244 @@ class StudyAssistantWindow(QMainWindow):
                 color: #D1D5DB; /* Slate-300 */
             }
         """)
+        self.stats_label.setStyleSheet("""
+            QLabel {
+                font-size: 13px;
+                color: #94A3B8; /* Slate-400 */
+            }
+        """)
+
+    def end_session(self):
+        # Detaches this window from the detection service without stopping the camera;
+        # the service itself is shut down when the application quits
+        if not self.session_active:
+            return
+        self.session_active = False
+        self.stop_summary()
+        self.stop_quiz()
+        self.frame_timer.stop()
+        self.speech.cancel()
+        self.detection_thread.alert_signal.disconnect(self.show_alert)
+        self.detection_thread.event_recorded.disconnect(self.on_event_recorded)
+        self.detection_thread.unbind_user()
 
     def closeEvent(self, event):
-        self.detection_thread.stop()
+        self.end_session()
         event.accept()
 
     def logout(self):
-        self.detection_thread.stop()
+        self.end_session()
         self.close()
         from auth import LoginDialog
         login_dialog = LoginDialog()
         if login_dialog.exec_() == QDialog.Accepted:
-            new_window = StudyAssistantWindow(login_dialog.current_user)
-            new_window.show()
-
-    def update_frame(self, frame):
-        frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB)
-        h, w, ch = frame_rgb.shape
-        bytes_per_line = ch * w
-        image = QImage(frame_rgb.data, w, h, bytes_per_line, QImage.Format_RGB888)
-        pixmap = QPixmap.fromImage(image)
-        scaled_pixmap = pixmap.scaled(800, 600, Qt.KeepAspectRatio, Qt.SmoothTransformation)
-        self.video_label.setPixmap(scaled_pixmap)
+            show_main_window(login_dialog.current_user)
+
+    def update_frame(self):
+        # Frames arrive already scaled and annotated by the detection thread
+        image = self.detection_thread.take_frame()
+        if image is None:
+            if not self.detection_thread.frames_produced:
+                status = self.models.status()
+                self.stats_label.setText(f"Detector: {status['detector']} · Face mesh: {status['face_mesh']}")
+            return
+        self.video_label.setPixmap(QPixmap.fromImage(image))
+        evidence = self.detection_thread.evidence_writer.stats()
+        self.stats_label.setText(f"Frames: {self.detection_thread.frames_produced} produced · "
+                                 f"{self.detection_thread.frames_displayed} displayed · "
+                                 f"{self.detection_thread.frames_dropped} dropped · "
+                                 f"YOLO on {self.detection_thread.phone_scheduler.run_ratio:.0%} of frames\n"
+                                 f"Evidence: {evidence['queue_depth']} queued · "
+                                 f"{evidence['mean_encode_ms']:.0f} ms avg encode")
 
     def show_alert(self, message, frame):
-        from models import engine
+        start = time.perf_counter()
         self.alert_label.setText(f"⚡ {message}")
         self.alert_animation.start()
-        engine.say(message)
-        engine.runAndWait()
-        print(f"[DEBUG] Speaking: {message}")
+        self.speech.say(message)  # Spoken on the speech worker, returns immediately
         self.log_label.setText(f"Distraction Log:\n{message} at {QTime.currentTime().toString()}")
         QTimer.singleShot(5000, lambda: self.alert_label.setText("Keeping you on track..."))
+        print(f"[DEBUG] show_alert blocked the GUI for {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    def on_event_recorded(self, username):
+        # The event recorder reports every write; an event from a previous session is not ours
+        if username == self.username:
+            self.refresh_event_log()
+
+    def refresh_event_log(self):
+        store = get_event_store()
+        today = datetime.datetime.combine(datetime.date.today(), datetime.time())
+        counts = store.count_by_type(self.username, today, today + datetime.timedelta(days=1))
+        recent = store.recent_events(self.username, limit=3)
+        if not recent:
+            self.log_label.setText("Distraction Log:\nNo distractions yet.")
+            return
+        lines = [f"{event.event_type} at {datetime.datetime.fromtimestamp(event.occurred_at):%Y-%m-%d %H:%M:%S}"
+                 for event in recent]
+        if counts:
+            summary = ", ".join(f"{event_type} x{count}" for event_type, count in counts.items())
+            lines.append(f"Today: {summary}")
+        self.log_label.setText("Distraction Log:\n" + "\n".join(lines))
 
     def upload_pdf(self):
+        pdf_path, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF Files (*.pdf)")
+        if not pdf_path:
+            return
+        # Pages are extracted in worker processes; the bar fills as they come in
+        self.upload_btn.setEnabled(False)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)
-        pdf_path, _ = QFileDialog.getOpenFileName(self, "Select PDF", "", "PDF Files (*.pdf)")
-        if pdf_path:
-            try:
-                with open(pdf_path, 'rb') as file:
-                    pdf_reader = PyPDF2.PdfReader(file)
-                    text = ""
-                    for page in pdf_reader.pages:
-                        text += page.extract_text()
-                    self.pdf_text = text
-                    self.clear_output()
-                    label = QLabel("✅ Notes uploaded successfully!")
-                    label.setStyleSheet("font-size: 16px; color: #3B82F6; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-                    self.output_layout.addWidget(label)
-            except Exception as e:
-                self.clear_output()
-                label = QLabel(f"❌ Error: {e}")
-                label.setStyleSheet("font-size: 16px; color: #EF4444; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-                self.output_layout.addWidget(label)
+        self.ingest_worker = PdfIngestWorker(pdf_path)
+        self.ingest_worker.progress.connect(self.upload_progress)
+        self.ingest_worker.succeeded.connect(self.upload_finished)
+        self.ingest_worker.failed.connect(self.upload_failed)
+        self.ingest_worker.start()
+
+    def upload_progress(self, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+
+    def upload_finished(self, document):
+        self.upload_btn.setEnabled(True)
         self.progress_bar.setVisible(False)
+        get_notes_library().add(self.username, document.digest, os.path.basename(document.path),
+                                len(document.text), document.text.size)
+        self.load_library(checked={document.digest})
+        self.clear_output()
+        source = "from cache" if document.cached else "extracted"
+        label = QLabel(f"✅ Notes uploaded successfully! ({len(document.text)} pages, {source})")
+        label.setStyleSheet("font-size: 16px; color: #3B82F6; background-color: #2D3748; padding: 12px; border-radius: 8px;")
+        self.output_layout.addWidget(label)
+
+    def upload_failed(self, error):
+        self.upload_btn.setEnabled(True)
+        self.progress_bar.setVisible(False)
+        self.clear_output()
+        label = QLabel(f"❌ Error: {error}")
+        label.setStyleSheet("font-size: 16px; color: #EF4444; background-color: #2D3748; padding: 12px; border-radius: 8px;")
+        self.output_layout.addWidget(label)
+
+    def show_notes_warning(self, text):
+        self.clear_output()
+        label = QLabel(f"⚠️ {text}")
+        label.setStyleSheet("font-size: 16px; color: #F59E0B; background-color: #2D3748; padding: 12px; border-radius: 8px;")
+        self.output_layout.addWidget(label)
+
+    def load_library(self, checked=None):
+        # Only the list of documents is loaded; their text stays on disk until used.
+        # Without `checked` the most recently uploaded document is ticked.
+        documents = get_notes_library().documents(self.username)
+        if checked is None:
+            checked = {documents[0].digest} if documents else set()
+        self.library_list.clear()
+        for document in documents:
+            item = QListWidgetItem(f"{document.title} ({document.pages} pages)")
+            item.setData(Qt.UserRole, document.digest)
+            item.setFlags(item.flags() | Qt.ItemIsUserCheckable)
+            item.setCheckState(Qt.Checked if document.digest in checked else Qt.Unchecked)
+            self.library_list.addItem(item)
+
+    def selected_documents(self):
+        items = (self.library_list.item(i) for i in range(self.library_list.count()))
+        return [item.data(Qt.UserRole) for item in items if item.checkState() == Qt.Checked]
+
+    def notes_for_prompt(self):
+        # (documents, question bank key) for the summary or quiz: the ticked documents,
+        # or with a topic only the passages matching it best across them. Shows a
+        # warning and returns None if there is nothing to use.
+        digests = self.selected_documents()
+        if not digests:
+            self.show_notes_warning("Tick the notes to use first!" if self.library_list.count() else "Upload notes first!")
+            return None
+        library = get_notes_library()
+        try:
+            documents = [library.open(digest) for digest in digests]
+        except RuntimeError as e:
+            self.show_notes_warning(str(e))
+            return None
+        key = "+".join(sorted(digests))
+        topic = self.topic_input.text().strip()
+        if not topic:
+            return documents, key
+        store = IndexStore()
+        indexes = [store.load(digest) for digest in digests]
+        if None in indexes:
+            print("[ERROR] No topic index for some of these notes, using all of them")
+            return documents, key
+        text = retrieve(indexes, topic)
+        if not text:
+            self.show_notes_warning(f"Nothing about '{topic}' found in your notes")
+            return None
+        return [text], f"{key}:{topic.lower()}"
 
     def generate_summary(self):
-        if not hasattr(self, 'pdf_text'):
-            self.clear_output()
-            label = QLabel("⚠️ Upload notes first!")
-            label.setStyleSheet("font-size: 16px; color: #F59E0B; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-            self.output_layout.addWidget(label)
+        notes = self.notes_for_prompt()
+        if notes is None:
             return
+        # Large notes are summarized chunk by chunk (and several documents one at a time)
+        # on a worker thread, then combined; the final summary streams into the view
+        self.summary = ""
+        self.summary_requested_at = time.perf_counter()
+        self.summary_first_text = None
+        self.display_summary()
+        self.summary_view.setPlaceholderText("Summarizing...")
+        self.download_btn.setEnabled(False)
+        self.summary_btn.setEnabled(False)
+        self.cancel_summary_btn.setVisible(True)
         self.progress_bar.setVisible(True)
         self.progress_bar.setRange(0, 0)
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = f"Summarize this text:\n\n{self.pdf_text}"
-            response = model.generate_content(prompt)
-            self.summary = response.text
-            self.display_summary()
-        except Exception as e:
-            self.clear_output()
-            label = QLabel(f"❌ Error: {e}")
-            label.setStyleSheet("font-size: 16px; color: #EF4444; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-            self.output_layout.addWidget(label)
+        self.summary_worker = SummaryWorker(Summarizer(create_llm_client()), notes[0])
+        self.summary_worker.progress.connect(self.summary_progress)
+        self.summary_worker.text.connect(self.summary_text_arrived)
+        self.summary_worker.succeeded.connect(self.summary_finished)
+        self.summary_worker.failed.connect(self.summary_failed)
+        self.summary_worker.start()
+
+    def summary_progress(self, stage, done, total):
+        self.progress_bar.setRange(0, total)
+        self.progress_bar.setValue(done)
+        self.progress_bar.setFormat(f"Summarizing ({stage}) %v/%m")
+
+    def summary_text_arrived(self, piece):
+        if self.summary_first_text is None:
+            # Measured on the GUI thread, i.e. when the text actually becomes visible
+            self.summary_first_text = time.perf_counter() - self.summary_requested_at
+            self.progress_bar.setRange(0, 0)
+            self.progress_bar.setFormat("Writing summary...")
+        self.summary_view.moveCursor(QTextCursor.End)
+        self.summary_view.insertPlainText(piece)
+
+    def summary_finished_common(self):
+        self.summary_btn.setEnabled(True)
+        self.cancel_summary_btn.setVisible(False)
         self.progress_bar.setVisible(False)
+        self.progress_bar.resetFormat()
+
+    def summary_finished(self, summary):
+        self.summary_finished_common()
+        self.summary = summary
+        total = time.perf_counter() - self.summary_requested_at
+        first = self.summary_first_text if self.summary_first_text is not None else total
+        self.summary_group.setTitle(f"Summary (first text {first:.1f}s, complete {total:.1f}s)")
+        self.download_btn.setEnabled(True)
+        print(f"[DEBUG] Summary: first text after {first * 1000:.0f} ms, complete after {total * 1000:.0f} ms")
+
+    def summary_failed(self, error):
+        self.summary_finished_common()
+        self.clear_output()
+        label = QLabel(f"❌ Error: {error}")
+        label.setStyleSheet("font-size: 16px; color: #EF4444; background-color: #2D3748; padding: 12px; border-radius: 8px;")
+        self.output_layout.addWidget(label)
+
+    def cancel_summary(self):
+        # Takes effect in the UI at once; the worker stops after its in-flight requests
+        self.stop_summary()
+        self.summary_group.setTitle("Summary (cancelled)")
 
     def display_summary(self):
         self.clear_output()
-        summary_group = QGroupBox("Summary")
-        summary_group.setStyleSheet("""
+        self.summary_group = QGroupBox("Summary")
+        self.summary_group.setStyleSheet("""
             QGroupBox {
                 background-color: #2D3748; /* Slate-800 */
                 border: none;
@@ -398,10 +615,10 @@ class StudyAssistantWindow(QMainWindow):
             }
         """)
         summary_layout = QVBoxLayout()
-        summary_text = QTextEdit()
-        summary_text.setReadOnly(True)
-        summary_text.setText(self.summary)
-        summary_text.setStyleSheet("""
+        self.summary_view = QTextEdit()
+        self.summary_view.setReadOnly(True)
+        self.summary_view.setText(self.summary)
+        self.summary_view.setStyleSheet("""
             QTextEdit {
                 background-color: #4B5563; /* Slate-600 */
                 color: #F1F5F9;
@@ -427,13 +644,13 @@ class StudyAssistantWindow(QMainWindow):
                 height: 0;
             }
         """)
-        summary_text.setMinimumHeight(700)  # Increased size
-        summary_layout.addWidget(summary_text)
-        summary_group.setLayout(summary_layout)
-        self.output_layout.addWidget(summary_group)
+        self.summary_view.setMinimumHeight(700)  # Increased size
+        summary_layout.addWidget(self.summary_view)
+        self.summary_group.setLayout(summary_layout)
+        self.output_layout.addWidget(self.summary_group)
 
-        download_btn = QPushButton("⬇ Download Summary as PDF")
-        download_btn.setStyleSheet("""
+        self.download_btn = QPushButton("⬇ Download Summary as PDF")
+        self.download_btn.setStyleSheet("""
             QPushButton {
                 background-color: #3B82F6;
                 color: #F1F5F9;
@@ -452,44 +669,71 @@ class StudyAssistantWindow(QMainWindow):
                 background-color: #2563EB;
             }
         """)
-        download_btn.clicked.connect(self.download_summary)
-        self.output_layout.addWidget(download_btn)
+        self.download_btn.clicked.connect(self.download_summary)
+        self.output_layout.addWidget(self.download_btn)
         self.output_layout.addStretch()
 
     def generate_quiz(self):
-        if not hasattr(self, 'pdf_text'):
-            self.clear_output()
-            label = QLabel("⚠️ Upload notes first!")
-            label.setStyleSheet("font-size: 16px; color: #F59E0B; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-            self.output_layout.addWidget(label)
+        notes = self.notes_for_prompt()
+        if notes is None:
             return
-        self.progress_bar.setVisible(True)
-        self.progress_bar.setRange(0, 0)
-        try:
-            model = genai.GenerativeModel('gemini-1.5-flash')
-            prompt = f"""Create 5 multiple-choice questions based on this text in JSON format:
-            Format: 
-            [
-                {{
-                    "question": "Question text",
-                    "options": ["Option A", "Option B", "Option C", "Option D"],
-                    "correct_answer": "Option A"
-                }}
-            ]
-            Text:\n\n{self.pdf_text}"""
-            response = model.generate_content(prompt)
-            quiz_text = response.text.strip()
-            if quiz_text.startswith("```json"):
-                quiz_text = quiz_text[7:-3].strip()
-            self.quiz_data = json.loads(quiz_text)
-            self.display_quiz()
-            self.show_content("quiz")  # Switch to Quiz tab
-        except Exception as e:
-            self.clear_output()
-            label = QLabel(f"❌ Error: {e}")
-            label.setStyleSheet("font-size: 16px; color: #EF4444; background-color: #2D3748; padding: 12px; border-radius: 8px;")
-            self.output_layout.addWidget(label)
-        self.progress_bar.setVisible(False)
+        # Questions due for review and ones not yet seen come straight from the
+        # question bank; only the shortfall is generated, concurrently over
+        # different parts of the notes, and appears one by one as it is validated
+        count = self.quiz_count_spin.value()
+        self.stop_quiz()
+        bank = get_question_bank()
+        documents, self.quiz_bank_key = notes
+        self.quiz_data = bank.sample(self.username, self.quiz_bank_key, count)
+        self.quiz_target = count
+        self.display_quiz()
+        self.show_content("quiz")  # Switch to Quiz tab
+        missing = count - len(self.quiz_data)
+        if missing <= 0:
+            self.quiz_status_label.setText(f"{count} questions from your question bank")
+            return
+        self.quiz_status_label.setText(f"{len(self.quiz_data)} questions from your question bank, "
+                                       f"generating {missing} new...")
+        self.quiz_gen_btn.setEnabled(False)
+        known = bank.known_questions(self.quiz_bank_key)
+        self.quiz_worker = QuizWorker(QuizEngine(create_llm_client()), documents, missing,
+                                      exclude=known, first_variant=len(known) + 1)
+        self.quiz_worker.question.connect(self.add_quiz_question)
+        self.quiz_worker.succeeded.connect(self.quiz_finished)
+        self.quiz_worker.failed.connect(self.quiz_failed)
+        self.quiz_worker.start()
+
+    def add_quiz_question(self, question):
+        # Saved to the bank first so the answer can be recorded against its id
+        question = get_question_bank().add(self.quiz_bank_key, question) or question
+        self.quiz_data.append(question)
+        self.show_question(len(self.quiz_data), question)
+        self.quiz_status_label.setText(f"{len(self.quiz_data)}/{self.quiz_target} questions ready...")
+
+    def quiz_finished(self, questions):
+        self.quiz_gen_btn.setEnabled(True)
+        if len(self.quiz_data) < self.quiz_target:
+            self.quiz_status_label.setText(f"⚠️ Only {len(self.quiz_data)} of {self.quiz_target} questions "
+                                           "could be generated")
+        else:
+            self.quiz_status_label.setText(f"{len(self.quiz_data)} questions")
+
+    def quiz_failed(self, error):
+        self.quiz_gen_btn.setEnabled(True)
+        self.quiz_status_label.setText(f"❌ Error: {error}")
+
+    def stop_quiz(self):
+        # Same as stop_summary: the old worker must not add questions to a new quiz
+        worker = getattr(self, 'quiz_worker', None)
+        if worker is None or not worker.isRunning():
+            return
+        worker.cancel()
+        for signal in (worker.question, worker.succeeded, worker.failed):
+            signal.disconnect()
+        self.retired_workers.append(worker)
+        worker.finished.connect(lambda: self.retired_workers.remove(worker))
+        self.quiz_worker = None
+        self.quiz_gen_btn.setEnabled(True)
 
     def display_quiz(self):
         # Clear existing quiz content
@@ -499,61 +743,13 @@ class StudyAssistantWindow(QMainWindow):
                 child.widget().deleteLater()
 
         self.button_groups = []
-        for i, q in enumerate(self.quiz_data, 1):
-            question_group = QGroupBox(f"Question {i}: {q['question']}")
-            question_group.setStyleSheet("""
-                QGroupBox {
-                    background-color: #2D3748;
-                    border: none;
-                    border-radius: 12px;
-                    margin-top: 20px;
-                    padding: 25px;
-                    color: #F1F5F9;
-                    font-size: 20px;
-                    font-family: 'Roboto', sans-serif;
-                    font-weight: 600;
-                    box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
-                }
-            """)
-            question_layout = QVBoxLayout()
-            question_layout.setSpacing(15)  # More spacing between options
-            button_group = QButtonGroup()
-            button_group.setExclusive(True)
-            self.button_groups.append((button_group, q['correct_answer']))
-            for option in q['options']:
-                radio = QRadioButton(option)
-                radio.setStyleSheet("""
-                    QRadioButton {
-                        color: #F1F5F9;
-                        font-size: 18px;
-                        font-family: 'Roboto', sans-serif;
-                        padding: 12px;
-                        spacing: 10px;
-                        background-color: transparent;
-                    }
-                    QRadioButton::indicator {
-                        width: 24px;
-                        height: 24px;
-                        border-radius: 12px;
-                        border: 2px solid #3B82F6;
-                        background-color: #1E293B;
-                    }
-                    QRadioButton::indicator:checked {
-                        background-color: #3B82F6;
-                        border: 2px solid #60A5FA;
-                    }
-                    QRadioButton:hover {
-                        background-color: #4B5563;
-                        border-radius: 8px;
-                    }
-                """)
-                question_layout.addWidget(radio)
-                button_group.addButton(radio)
-            question_group.setLayout(question_layout)
-            self.quiz_content_layout.addWidget(question_group)
-
-        evaluate_btn = QPushButton("📊 Evaluate Score")
-        evaluate_btn.setStyleSheet("""
+        self.quiz_answers_recorded = False
+        self.quiz_status_label = QLabel("")
+        self.quiz_status_label.setStyleSheet("font-size: 16px; color: #94A3B8; padding: 6px;")
+        self.quiz_content_layout.addWidget(self.quiz_status_label)
+
+        self.evaluate_btn = QPushButton("📊 Evaluate Score")
+        self.evaluate_btn.setStyleSheet("""
             QPushButton {
                 background-color: #3B82F6;
                 color: #F1F5F9;
@@ -572,19 +768,86 @@ class StudyAssistantWindow(QMainWindow):
                 background-color: #2563EB;
             }
         """)
-        evaluate_btn.clicked.connect(self.evaluate_quiz_score)
-        self.quiz_content_layout.addWidget(evaluate_btn)
+        self.evaluate_btn.clicked.connect(self.evaluate_quiz_score)
+        self.quiz_content_layout.addWidget(self.evaluate_btn)
         self.quiz_content_layout.addStretch()
 
-        self.quiz_placeholder.setVisible(False)
+        for i, q in enumerate(self.quiz_data, 1):
+            self.show_question(i, q)
+
+    def show_question(self, i, q):
+        # Questions go above the Evaluate button, in the order they arrive
+        question_group = QGroupBox(f"Question {i}: {q['question']}")
+        question_group.setStyleSheet("""
+            QGroupBox {
+                background-color: #2D3748;
+                border: none;
+                border-radius: 12px;
+                margin-top: 20px;
+                padding: 25px;
+                color: #F1F5F9;
+                font-size: 20px;
+                font-family: 'Roboto', sans-serif;
+                font-weight: 600;
+                box-shadow: 0 4px 6px rgba(0, 0, 0, 0.1);
+            }
+        """)
+        question_layout = QVBoxLayout()
+        question_layout.setSpacing(15)  # More spacing between options
+        button_group = QButtonGroup(question_group)
+        button_group.setExclusive(True)
+        self.button_groups.append((button_group, q))
+        for option in q['options']:
+            radio = QRadioButton(option)
+            radio.setStyleSheet("""
+                QRadioButton {
+                    color: #F1F5F9;
+                    font-size: 18px;
+                    font-family: 'Roboto', sans-serif;
+                    padding: 12px;
+                    spacing: 10px;
+                    background-color: transparent;
+                }
+                QRadioButton::indicator {
+                    width: 24px;
+                    height: 24px;
+                    border-radius: 12px;
+                    border: 2px solid #3B82F6;
+                    background-color: #1E293B;
+                }
+                QRadioButton::indicator:checked {
+                    background-color: #3B82F6;
+                    border: 2px solid #60A5FA;
+                }
+                QRadioButton:hover {
+                    background-color: #4B5563;
+                    border-radius: 8px;
+                }
+            """)
+            question_layout.addWidget(radio)
+            button_group.addButton(radio)
+        question_group.setLayout(question_layout)
+        self.quiz_content_layout.insertWidget(self.quiz_content_layout.indexOf(self.evaluate_btn), question_group)
 
     def evaluate_quiz_score(self):
         score = 0
         total_questions = len(self.quiz_data)
-        for button_group, correct_answer in self.button_groups:
+        if not total_questions:
+            return
+        answers = []
+        for button_group, q in self.button_groups:
             selected_button = button_group.checkedButton()
-            if selected_button and selected_button.text() == correct_answer:
+            chosen = selected_button.text() if selected_button else None
+            if chosen == q['correct_answer']:
                 score += 1
+            if 'id' in q:
+                answers.append((q['id'], chosen, chosen == q['correct_answer']))
+        if not self.quiz_answers_recorded:
+            # Unanswered questions count as wrong and come back at the next quiz
+            self.quiz_answers_recorded = True
+            bank = get_question_bank()
+            for question_id, chosen, correct in answers:
+                bank.record_answer(self.username, question_id, chosen, correct)
 
         score_text = f"Score: {score}/{total_questions} ({(score/total_questions)*100:.1f}%)"
         score_label = QLabel(score_text)
@@ -608,7 +871,22 @@ class StudyAssistantWindow(QMainWindow):
             except Exception as e:
                 print(f"[ERROR] Failed to save summary: {e}")
 
+    def stop_summary(self):
+        # A summary still streaming must not write into widgets that are about to be replaced
+        worker = getattr(self, 'summary_worker', None)
+        if worker is None or not worker.isRunning():
+            return
+        worker.cancel()
+        for signal in (worker.progress, worker.text, worker.succeeded, worker.failed):
+            signal.disconnect()
+        # Keep the thread referenced until it has actually stopped
+        self.retired_workers.append(worker)
+        worker.finished.connect(lambda: self.retired_workers.remove(worker))
+        self.summary_worker = None
+        self.summary_finished_common()
+
     def clear_output(self):
+        self.stop_summary()
         while self.output_layout.count():
             child = self.output_layout.takeAt(0)
             if child.widget():
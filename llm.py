@@ -0,0 +1,97 @@
+import re
+import json
+import time
+import zlib
+import threading
+from config import LLM_BACKEND, GEMINI_MODEL, CHARS_PER_TOKEN
+from models import get_models
+
+FAKE_SENTENCE_WORDS = 12
+
+
+def estimate_tokens(text):
+    return len(text) // CHARS_PER_TOKEN + 1
+
+
+class GeminiClient:
+    name = GEMINI_MODEL
+
+    def generate(self, prompt):
+        # The configured GenerativeModel comes from the registry, which may already have it warm
+        return get_models().get("gemini").generate_content(prompt).text
+
+    def stream(self, prompt):
+        # Yields the response text piece by piece as Gemini produces it
+        for chunk in get_models().get("gemini").generate_content(prompt, stream=True):
+            yield chunk.text
+
+
+class FakeLLMClient:
+    # Offline stand-in for Gemini: answers with the first sentence (at most
+    # FAKE_SENTENCE_WORDS words) of every paragraph in the prompt. `latency` is the wait before the first word and
+    # `token_latency` the wait for each word after it. Counts calls and can be
+    # told to fail the next few requests.
+    name = "fake"
+
+    def __init__(self, latency=0.0, fail_next=0, token_latency=0.0, malformed_every=0):
+        self.latency = latency
+        self.token_latency = token_latency
+        self.fail_next = fail_next
+        self.malformed_every = malformed_every  # Quiz answers: break every Nth question (0 never)
+        self.questions_written = 0
+        self.calls = 0
+        self.lock = threading.Lock()
+
+    def answer(self, prompt):
+        with self.lock:
+            self.calls += 1
+            if self.fail_next > 0:
+                self.fail_next -= 1
+                raise ConnectionError("fake LLM failure")
+        quiz = re.match(r"Write (\d+) multiple-choice questions", prompt)
+        if quiz:
+            return self.quiz(int(quiz.group(1)), prompt)
+        body = prompt.split("\n\n", 1)[-1]
+        sentences = [re.split(r"(?<=[.!?])\s", paragraph.strip(), maxsplit=1)[0].split()[:FAKE_SENTENCE_WORDS]
+                     for paragraph in body.split("\n\n") if paragraph.strip()]
+        return "\n".join(" ".join(words) for words in sentences)
+
+    def quiz(self, count, prompt):
+        # A JSON array of questions about words in the notes, wrapped in a code fence like Gemini does
+        # The same question set of the same notes always gets the same questions, another set different ones
+        notes = prompt.rsplit("Notes:", 1)[-1]
+        words = re.findall(r"[A-Za-z]{4,}", notes) or ["notes"]
+        question_set = re.search(r"question set (\d+)", prompt)
+        seed = zlib.crc32(f"{question_set.group(1)}\0{notes}".encode('utf-8')) % 100000 if question_set else 0
+        items = []
+        for i in range(count):
+            with self.lock:
+                self.questions_written += 1
+                broken = self.malformed_every and self.questions_written % self.malformed_every == 0
+            number = seed * 100 + i if question_set else self.questions_written
+            word = words[(number * 7) % len(words)]
+            item = json.dumps({"question": f"What does the notes' term '{word}' refer to? (#{number})",
+                               "options": [f"{word} meaning {n}" for n in "ABCD"],
+                               "correct_answer": f"{word} meaning A"})
+            # A trailing comma, a typical way model output stops being valid JSON
+            items.append(item.replace('D"]', 'D",]') if broken else item)
+        return "```json\n[\n" + ",\n".join(items) + "\n]\n```"
+
+    def generate(self, prompt):
+        response = self.answer(prompt)
+        time.sleep(self.latency + self.token_latency * len(response.split()))
+        return response
+
+    def stream(self, prompt):
+        response = self.answer(prompt)
+        time.sleep(self.latency)
+        for piece in re.findall(r"\S+\s*", response):
+            time.sleep(self.token_latency)
+            yield piece
+
+
+CLIENTS = {"gemini": GeminiClient, "fake": FakeLLMClient}
+
+
+def create_llm_client(backend=LLM_BACKEND):
+    return CLIENTS[backend]()
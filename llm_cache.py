@@ -0,0 +1,125 @@
+import os
+import time
+import hashlib
+import threading
+from config import LLM_CACHE_PATH, LLM_CACHE_MAX_BYTES, LLM_CACHE_TTL
+from database import ConnectionPool
+
+SELECT_RESPONSE = "SELECT response, created_at FROM responses WHERE key = ?"
+TOUCH_RESPONSE = "UPDATE responses SET last_used = ? WHERE key = ?"
+INSERT_RESPONSE = ("INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                   "VALUES (?, ?, ?, ?, ?, ?)")
+
+
+class LLMCache:
+    # Persistent cache of LLM responses in its own SQLite file. Entries are
+    # keyed by the SHA-256 of (model, prompt template, document), expire after
+    # `ttl` seconds and are evicted least-recently-used first once the stored
+    # responses exceed `max_bytes`.
+    def __init__(self, path=LLM_CACHE_PATH, max_bytes=LLM_CACHE_MAX_BYTES, ttl=LLM_CACHE_TTL):
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self.pool = ConnectionPool(path, size=2)
+        self.max_bytes = max_bytes
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.lock = threading.Lock()
+        with self.pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS responses
+                            (key TEXT PRIMARY KEY, model TEXT, response TEXT, size INTEGER,
+                             created_at REAL, last_used REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_last_used ON responses (last_used)")
+            self.total_bytes = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+
+    def key(self, model, template, document):
+        sha = hashlib.sha256()
+        for part in (model, template, document):
+            sha.update(part.encode('utf-8'))
+            sha.update(b"\0")
+        return sha.hexdigest()
+
+    def get(self, model, template, document):
+        key = self.key(model, template, document)
+        now = time.time()
+        with self.pool.connection() as conn:
+            row = conn.execute(SELECT_RESPONSE, (key,)).fetchone()
+            if row is not None and now - row[1] > self.ttl:
+                self.delete(conn, [key])
+                row = None
+            if row is not None:
+                conn.execute(TOUCH_RESPONSE, (now, key))
+        with self.lock:
+            if row is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+        return row[0] if row else None
+
+    def put(self, model, template, document, response):
+        key = self.key(model, template, document)
+        size = len(response.encode('utf-8'))
+        now = time.time()
+        with self.pool.connection() as conn:
+            self.delete(conn, [key])
+            conn.execute(INSERT_RESPONSE, (key, model, response, size, now, now))
+            with self.lock:
+                self.total_bytes += size
+            if self.total_bytes > self.max_bytes:
+                self.evict(conn)
+
+    def discard(self, model, template, document):
+        # For responses that turned out to be unusable (e.g. malformed JSON)
+        with self.pool.connection() as conn:
+            self.delete(conn, [self.key(model, template, document)])
+
+    def delete(self, conn, keys):
+        for key in keys:
+            row = conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            if row is not None:
+                conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                with self.lock:
+                    self.total_bytes -= row[0]
+
+    def evict(self, conn):
+        # Drops expired entries, then the least recently used until back under the size limit
+        cutoff = time.time() - self.ttl
+        excess = self.total_bytes - self.max_bytes
+        victims = []
+        for key, size, created_at in conn.execute("SELECT key, size, created_at FROM responses ORDER BY last_used").fetchall():
+            if created_at < cutoff or excess > 0:
+                victims.append(key)
+                excess -= size
+        self.delete(conn, victims)
+        with self.lock:
+            self.evictions += len(victims)
+
+    def stats(self):
+        with self.pool.connection() as conn:
+            entries = conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {"hits": self.hits, "misses": self.misses, "hit_rate": self.hits / lookups if lookups else 0.0,
+                    "evictions": self.evictions, "entries": entries, "bytes": self.total_bytes}
+
+
+def cached_generate(client, template, document, cache=None):
+    # template.format(text=document) is only sent when the cache has no answer
+    cache = cache if cache is not None else get_llm_cache()
+    response = cache.get(client.name, template, document)
+    if response is None:
+        response = client.generate(template.format(text=document))
+        cache.put(client.name, template, document, response)
+    return response
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_llm_cache():
+    global _cache
+    with _cache_lock:
+        if _cache is None:
+            _cache = LLMCache()
+        return _cache
@@ -1,22 +1,38 @@
 import sys
 import os
-import mediapipe as mp
 from PyQt5.QtWidgets import QApplication, QDialog  # Added QDialog import
-from gui import StudyAssistantWindow
 from auth import LoginDialog
+from models import get_models
+from messaging import get_outbox
+from speech import shutdown_speech_service
+
+def shutdown_detection():
+    # Imported here so the login window does not wait for OpenCV and the detection pipeline
+    from detection_thread import shutdown_detection_service
+    shutdown_detection_service()
 
 def main():
     os.chdir(os.path.dirname(os.path.abspath(__file__)))
     app = QApplication(sys.argv)
-    
+    # The camera and detection workers live across logins and stop only when the app exits
+    app.aboutToQuit.connect(shutdown_detection)
+    app.aboutToQuit.connect(shutdown_speech_service)
+
+    # Models load in the background while the user logs in
+    get_models().preload()
+
+    # The notification outbox creates its table here, not on the detection thread at the first alert.
+    # It stops after detection so the last alerts are still written to the table
+    app.aboutToQuit.connect(get_outbox().stop)
+
     # Show login/signup dialog
     login_dialog = LoginDialog()
     if login_dialog.exec_() == QDialog.Accepted:
-        window = StudyAssistantWindow(login_dialog.current_user)
-        window.show()
+        from gui import show_main_window
+        show_main_window(login_dialog.current_user)
         sys.exit(app.exec_())
     else:
         sys.exit(0)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    main()
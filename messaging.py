@@ -1,30 +1,190 @@
-from twilio.rest import Client
-from config import TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE
-
-client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
-
-def send_whatsapp_message(to_number, message):
-    from_number = f"whatsapp:{TWILIO_PHONE}"
-    print(f"[DEBUG] Sending from: {from_number}, to: whatsapp:{to_number}")
-    try:
-        client.messages.create(
-            body=message,
-            from_=from_number,
-            to=f"whatsapp:{to_number}"
-        )
-        print(f"[DEBUG] WhatsApp message sent to {to_number}: {message}")
-    except Exception as e:
-        print(f"[ERROR] Failed to send WhatsApp message: {e}")
+import threading
+import time
+import collections
+from config import (TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE, NOTIFY_TRANSPORT, NOTIFY_MAX_ATTEMPTS,
+                    NOTIFY_RETRY_BACKOFF, GUARDIAN_MIN_INTERVAL, NOTIFY_POLL_INTERVAL)
+from database import get_pool, get_user_repository
+
+
+class TwilioTransport:
+    def __init__(self):
+        self.client = None
+        if all([TWILIO_SID, TWILIO_AUTH_TOKEN, TWILIO_PHONE]):
+            from twilio.rest import Client
+            self.client = Client(TWILIO_SID, TWILIO_AUTH_TOKEN)
+
+    def send(self, to_number, body):
+        if self.client is None:
+            raise RuntimeError("Twilio credentials are not configured")
+        from_number = f"whatsapp:{TWILIO_PHONE}"
+        print(f"[DEBUG] Sending from: {from_number}, to: whatsapp:{to_number}")
+        self.client.messages.create(body=body, from_=from_number, to=f"whatsapp:{to_number}")
+
+
+class FakeTwilioTransport:
+    # Local stand-in for Twilio: records messages instead of sending them and can
+    # be told to fail the next few sends to exercise retries
+    def __init__(self, fail_next=0):
+        self.sent = []
+        self.fail_next = fail_next
+
+    def send(self, to_number, body):
+        if self.fail_next > 0:
+            self.fail_next -= 1
+            raise ConnectionError("fake transport failure")
+        self.sent.append((to_number, body))
+        print(f"[DEBUG] (fake) WhatsApp to {to_number}: {body}")
+
+
+TRANSPORTS = {"twilio": TwilioTransport, "fake": FakeTwilioTransport}
+
+# Last message each guardian got, so the rate limit holds across restarts
+LAST_SENT = """SELECT u.guardian_phone, MAX(o.sent_at) FROM notification_outbox o
+               JOIN users u ON u.username = o.username
+               WHERE o.status = 'sent' GROUP BY u.guardian_phone"""
+
+
+def format_message(student_name, events, now):
+    # events: list of (event_type, event_time, created_at), oldest first
+    if len(events) == 1:
+        event_type, event_time, _ = events[0]
+        return f"Study Buddy Alert: {student_name} was caught {event_type} at {event_time}."
+    counts = collections.Counter(event_type for event_type, _, _ in events)
+    breakdown = ", ".join(f"{event_type} x{count}" for event_type, count in counts.most_common())
+    minutes = max(1, round((now - events[0][2]) / 60))
+    return (f"Study Buddy Alert: {student_name} had {len(events)} distractions in the last {minutes} minutes "
+            f"({breakdown}), most recently {events[-1][0]} at {events[-1][1]}.")
+
+
+class NotificationOutbox:
+    # Guardian alerts are handed over in memory, persisted to the outbox table
+    # and sent by a background worker, so the detection thread never waits on
+    # sqlite or Twilio. Failed sends are retried with exponential backoff, and
+    # each guardian gets at most one message per GUARDIAN_MIN_INTERVAL; events
+    # raised in between are sent together as a single digest.
+    def __init__(self, transport, pool, users, min_interval=GUARDIAN_MIN_INTERVAL,
+                 max_attempts=NOTIFY_MAX_ATTEMPTS, backoff=NOTIFY_RETRY_BACKOFF):
+        self.transport = transport
+        self.pool = pool
+        self.users = users
+        self.min_interval = min_interval
+        self.max_attempts = max_attempts
+        self.backoff = backoff
+        self.incoming = collections.deque()
+        self.cond = threading.Condition()
+        self.last_sent = {}  # guardian phone -> time of last message, seeded from the table below
+        self.running = False
+        self.thread = None
+        self.users.init_schema()  # LAST_SENT joins on it, and the outbox may start before the login dialog
+        with self.pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS notification_outbox
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT, event_type TEXT,
+                             event_time TEXT, created_at REAL, status TEXT DEFAULT 'pending',
+                             attempts INTEGER DEFAULT 0, next_attempt_at REAL, last_error TEXT, sent_at REAL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_outbox_pending ON notification_outbox (status, next_attempt_at)")
+            self.last_sent.update(conn.execute(LAST_SENT).fetchall())
+
+    def enqueue(self, username, event_type, timestamp):
+        with self.cond:
+            self.incoming.append((username, event_type, timestamp, time.time()))
+            self.cond.notify()
+
+    def start(self):
+        self.running = True
+        self.thread = threading.Thread(target=self.run, name="notifications", daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        # Alerts still in memory are written to the table and go out on the next start
+        with self.cond:
+            self.running = False
+            self.cond.notify()
+        if self.thread is not None:
+            self.thread.join(timeout=5)
+        self.persist_incoming()
+
+    def run(self):
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.incoming or not self.running, NOTIFY_POLL_INTERVAL)
+                if not self.running:
+                    break
+            try:
+                self.persist_incoming()
+                self.dispatch_due()
+            except Exception as e:
+                print(f"[ERROR] Notification dispatch failed: {e}")
+
+    def persist_incoming(self):
+        with self.cond:
+            batch = list(self.incoming)
+            self.incoming.clear()
+        if not batch:
+            return
+        with self.pool.connection() as conn:
+            conn.executemany("INSERT INTO notification_outbox (username, event_type, event_time, created_at, next_attempt_at) "
+                             "VALUES (?, ?, ?, ?, ?)",
+                             [(username, event_type, event_time, created_at, created_at)
+                              for username, event_type, event_time, created_at in batch])
+
+    def dispatch_due(self, now=None):
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            rows = conn.execute("SELECT id, username, event_type, event_time, created_at, attempts "
+                                "FROM notification_outbox WHERE status = 'pending' AND next_attempt_at <= ? "
+                                "ORDER BY created_at", (now,)).fetchall()
+        by_user = collections.defaultdict(list)
+        for row in rows:
+            by_user[row[1]].append(row)
+
+        for username, events in by_user.items():
+            ids = [event[0] for event in events]
+            # Served from the repository's profile cache, not the database
+            profile = self.users.get_profile(username)
+            if not profile:
+                self.mark(ids, "failed", error="unknown user")
+                continue
+            guardian_phone, student_name = profile.guardian_phone, profile.name
+            if now - self.last_sent.get(guardian_phone, 0) < self.min_interval:
+                continue  # Rate limited; these events go out in the next digest
+            body = format_message(student_name, [(e[2], e[3], e[4]) for e in events], now)
+            try:
+                self.transport.send(guardian_phone, body)
+            except Exception as e:
+                attempts = max(event[5] for event in events) + 1
+                if attempts >= self.max_attempts:
+                    print(f"[ERROR] Giving up on guardian alert for {username} after {attempts} attempts: {e}")
+                    self.mark(ids, "failed", attempts=attempts, error=str(e))
+                else:
+                    delay = self.backoff * 2 ** (attempts - 1)
+                    print(f"[ERROR] Failed to send guardian alert for {username}, retrying in {delay}s: {e}")
+                    self.mark(ids, "pending", attempts=attempts, error=str(e), next_attempt_at=now + delay)
+                continue
+            self.last_sent[guardian_phone] = now
+            self.mark(ids, "sent", sent_at=now)
+            print(f"[DEBUG] WhatsApp message sent to {guardian_phone}: {body}")
+
+    def mark(self, ids, status, attempts=None, error=None, next_attempt_at=None, sent_at=None):
+        with self.pool.connection() as conn:
+            conn.executemany("UPDATE notification_outbox SET status = ?, attempts = COALESCE(?, attempts), "
+                             "last_error = COALESCE(?, last_error), next_attempt_at = COALESCE(?, next_attempt_at), "
+                             "sent_at = ? WHERE id = ?",
+                             [(status, attempts, error, next_attempt_at, sent_at, row_id) for row_id in ids])
+
+
+_outbox = None
+_outbox_lock = threading.Lock()
+
+
+def get_outbox():
+    global _outbox
+    with _outbox_lock:
+        if _outbox is None:
+            _outbox = NotificationOutbox(TRANSPORTS[NOTIFY_TRANSPORT](), get_pool(), get_user_repository())
+            _outbox.start()
+        return _outbox
+
 
 def notify_guardian(username, event_type, timestamp):
-    import sqlite3
-    conn = sqlite3.connect("users.db")
-    c = conn.cursor()
-    c.execute("SELECT guardian_phone, name FROM users WHERE username = ?", (username,))
-    result = c.fetchone()
-    conn.close()
-
-    if result:
-        guardian_phone, student_name = result
-        message = f"Study Buddy Alert: {student_name} was caught {event_type} at {timestamp}."
-        send_whatsapp_message(guardian_phone, message)
\ No newline at end of file
+    # Returns immediately; the outbox worker looks up the guardian and sends the message
+    get_outbox().enqueue(username, event_type, timestamp)
@@ -1,32 +1,104 @@
-import sys
 import os
+import time
+import threading
 import urllib.request
-import pyttsx3
-import google.generativeai as genai
-from ultralytics import YOLO
-from config import WEIGHTS_FILE, WEIGHTS_URL, GOOGLE_API_KEY
-import mediapipe as mp
 import logging
+from config import WEIGHTS_FILE, WEIGHTS_URL, GOOGLE_API_KEY, GEMINI_MODEL, MODEL_PRELOAD_ORDER
 
 # Suppress mediapipe and TensorFlow warnings
 logging.getLogger('mediapipe').setLevel(logging.ERROR)
 logging.getLogger('absl').setLevel(logging.ERROR)
 
-if not os.path.exists(WEIGHTS_FILE):
+
+def ensure_weights():
+    if os.path.exists(WEIGHTS_FILE):
+        return
     print(f"{WEIGHTS_FILE} not found. Attempting to download...")
     try:
         urllib.request.urlretrieve(WEIGHTS_URL, WEIGHTS_FILE)
         print(f"Downloaded {WEIGHTS_FILE} successfully.")
     except Exception as e:
-        print(f"Error downloading {WEIGHTS_FILE}: {e}")
-        print("Please download it manually from https://github.com/ultralytics/assets/releases and place it in the script directory.")
-        sys.exit(1)
-
-engine = pyttsx3.init()
-engine.setProperty('rate', 150)
-model = YOLO(WEIGHTS_FILE)
-model.overrides['verbose'] = False
-genai.configure(api_key=GOOGLE_API_KEY)
-
-mp_face_mesh = mp.solutions.face_mesh
-face_mesh = mp_face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True, min_detection_confidence=0.5, min_tracking_confidence=0.5)
\ No newline at end of file
+        raise RuntimeError(f"Error downloading {WEIGHTS_FILE}: {e}. Please download it manually from "
+                           "https://github.com/ultralytics/assets/releases and place it in the script directory.")
+
+
+def load_detector():
+    from detectors import create_detector
+    ensure_weights()
+    return create_detector()
+
+
+def load_face_mesh():
+    import mediapipe as mp
+    return mp.solutions.face_mesh.FaceMesh(max_num_faces=1, refine_landmarks=True,
+                                           min_detection_confidence=0.5, min_tracking_confidence=0.5)
+
+
+def load_gemini():
+    if not GOOGLE_API_KEY:
+        raise RuntimeError("GOOGLE_API_KEY not found in .env file; summaries and quizzes are unavailable")
+    import google.generativeai as genai
+    genai.configure(api_key=GOOGLE_API_KEY)
+    return genai.GenerativeModel(GEMINI_MODEL)
+
+
+LOADERS = {"detector": load_detector, "face_mesh": load_face_mesh, "gemini": load_gemini}
+
+
+class ModelRegistry:
+    # Heavy models are built on first use instead of at import time. preload()
+    # warms them on a background thread (started while the login dialog is up),
+    # so get() normally returns at once and only blocks if a model is still loading.
+    def __init__(self, loaders=LOADERS):
+        self.loaders = loaders
+        self.models = {}
+        self.errors = {}
+        self.load_times = {}
+        self.locks = {name: threading.Lock() for name in loaders}
+        self.thread = None
+
+    def get(self, name):
+        # Raises RuntimeError if the model cannot be loaded; the next call tries again
+        with self.locks[name]:
+            if name not in self.models:
+                start = time.perf_counter()
+                try:
+                    self.models[name] = self.loaders[name]()
+                except Exception as e:
+                    self.errors[name] = str(e)
+                    raise RuntimeError(f"Failed to load {name}: {e}") from e
+                self.errors.pop(name, None)
+                self.load_times[name] = time.perf_counter() - start
+                print(f"[DEBUG] Loaded {name} in {self.load_times[name]:.2f}s")
+            return self.models[name]
+
+    def preload(self, names=MODEL_PRELOAD_ORDER):
+        if self.thread is not None:
+            return
+        self.thread = threading.Thread(target=self.load_all, args=(names,), name="model-preload", daemon=True)
+        self.thread.start()
+
+    def load_all(self, names=MODEL_PRELOAD_ORDER):
+        for name in names:
+            try:
+                self.get(name)
+            except RuntimeError as e:
+                print(f"[ERROR] {e}")
+
+    def status(self):
+        # name -> "ready", "failed: <reason>" or "loading"
+        return {name: "ready" if name in self.models else
+                f"failed: {self.errors[name]}" if name in self.errors else "loading"
+                for name in self.loaders}
+
+
+_registry = None
+_registry_lock = threading.Lock()
+
+
+def get_models():
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
@@ -0,0 +1,148 @@
+import os
+import re
+import json
+import shutil
+import zlib
+import numpy as np
+from config import CACHE_DIR, INDEX_CHUNK_TOKENS, INDEX_HASH_BUCKETS, INDEX_TOP_K
+from text_chunks import split_chunks
+
+BM25_K1 = 1.2  # How quickly repeats of a word stop adding to a passage's score
+BM25_B = 0.75  # How strongly long passages are penalised
+INDEX_VERSION = 1  # Bump when the on-disk layout or weighting changes
+WORD = re.compile(r"[a-z0-9]+")
+
+
+def tokenize(text):
+    return WORD.findall(text.lower())
+
+
+def bucket(word, buckets):
+    return zlib.crc32(word.encode('utf-8')) % buckets
+
+
+class NotesIndex:
+    # BM25 over passages of one document, stored as a sparse passage x word
+    # matrix in column order (for each hashed word, the passages containing it
+    # and their precomputed BM25 weights) plus the passage text. Every array is
+    # memory-mapped, so opening an index reads almost nothing and a query only
+    # touches the columns of its own words.
+    def __init__(self, directory):
+        with open(os.path.join(directory, "meta.json"), encoding='utf-8') as f:
+            self.meta = json.load(f)
+        self.buckets = self.meta["buckets"]
+        self.columns = np.load(os.path.join(directory, "columns.npy"), mmap_mode='r')
+        self.passages = np.load(os.path.join(directory, "passages.npy"), mmap_mode='r')
+        self.weights = np.load(os.path.join(directory, "weights.npy"), mmap_mode='r')
+        self.offsets = np.load(os.path.join(directory, "offsets.npy"), mmap_mode='r')
+        self.text = np.memmap(os.path.join(directory, "text.bin"), dtype=np.uint8, mode='r') \
+            if self.offsets[-1] else np.zeros(0, dtype=np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def passage(self, i):
+        return self.text[self.offsets[i]:self.offsets[i + 1]].tobytes().decode('utf-8')
+
+    def search(self, query, k=INDEX_TOP_K):
+        # [(score, passage index)] best first, only passages sharing a word with the query
+        scores = np.zeros(len(self), dtype=np.float32)
+        for column in {bucket(word, self.buckets) for word in tokenize(query)}:
+            start, stop = self.columns[column], self.columns[column + 1]
+            np.add.at(scores, self.passages[start:stop], self.weights[start:stop])
+        hits = np.flatnonzero(scores)
+        if len(hits) > k:
+            hits = hits[np.argpartition(scores[hits], -k)[-k:]]
+        return sorted(((float(scores[i]), int(i)) for i in hits), reverse=True)
+
+    def retrieve(self, query, k=INDEX_TOP_K):
+        return retrieve([self], query, k)
+
+
+def retrieve(indexes, query, k=INDEX_TOP_K):
+    # The k best passages across the indexed documents, in document order and ready
+    # to go in a prompt; "" if nothing matches
+    hits = [(score, n, i) for n, index in enumerate(indexes) for score, i in index.search(query, k)]
+    best = sorted(sorted(hits, reverse=True)[:k], key=lambda hit: hit[1:])
+    return "\n\n".join(indexes[n].passage(i) for _, n, i in best)
+
+
+def build_index(text, directory, chunk_tokens=INDEX_CHUNK_TOKENS, buckets=INDEX_HASH_BUCKETS):
+    # Writes the index into a scratch directory and swaps it in, so a reader
+    # never sees half an index
+    chunks = split_chunks(text, chunk_tokens)
+    rows, cols, counts, lengths, hashed = [], [], [], [], {}
+    for row, chunk in enumerate(chunks):
+        tf = {}
+        words = tokenize(chunk)
+        for word in words:
+            column = hashed.get(word)
+            if column is None:
+                column = hashed[word] = bucket(word, buckets)
+            tf[column] = tf.get(column, 0) + 1
+        rows.extend([row] * len(tf))
+        cols.extend(tf.keys())
+        counts.extend(tf.values())
+        lengths.append(len(words))
+
+    rows = np.array(rows, dtype=np.int32)
+    cols = np.array(cols, dtype=np.int64)
+    tf = np.array(counts, dtype=np.float32)
+    lengths = np.array(lengths, dtype=np.float32)
+    df = np.bincount(cols, minlength=buckets)
+    idf = np.log1p((len(chunks) - df + 0.5) / (df + 0.5)).astype(np.float32)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / max(float(lengths.mean()) if len(chunks) else 0.0, 1.0))
+    weights = idf[cols] * tf * (BM25_K1 + 1) / (tf + norm[rows])
+    order = np.lexsort((rows, cols))
+    columns = np.zeros(buckets + 1, dtype=np.int64)
+    np.cumsum(df, out=columns[1:])
+    encoded = [chunk.encode('utf-8') for chunk in chunks]
+    offsets = np.zeros(len(chunks) + 1, dtype=np.int64)
+    np.cumsum([len(data) for data in encoded], out=offsets[1:])
+
+    tmp_dir = directory + ".tmp"
+    shutil.rmtree(tmp_dir, ignore_errors=True)
+    os.makedirs(tmp_dir)
+    np.save(os.path.join(tmp_dir, "columns.npy"), columns)
+    np.save(os.path.join(tmp_dir, "passages.npy"), rows[order])
+    np.save(os.path.join(tmp_dir, "weights.npy"), weights[order])
+    np.save(os.path.join(tmp_dir, "offsets.npy"), offsets)
+    with open(os.path.join(tmp_dir, "text.bin"), 'wb') as f:
+        for data in encoded:
+            f.write(data)
+    with open(os.path.join(tmp_dir, "meta.json"), 'w', encoding='utf-8') as f:
+        json.dump({"version": INDEX_VERSION, "buckets": buckets, "chunk_tokens": chunk_tokens,
+                   "passages": len(chunks)}, f)
+    shutil.rmtree(directory, ignore_errors=True)
+    os.replace(tmp_dir, directory)
+
+
+class IndexStore:
+    # One index directory per document, keyed like the page cache by the
+    # SHA-256 of the PDF, and rebuilt only when the settings it was built with change
+    def __init__(self, directory=os.path.join(CACHE_DIR, "index"), chunk_tokens=INDEX_CHUNK_TOKENS,
+                 buckets=INDEX_HASH_BUCKETS):
+        self.directory = directory
+        self.chunk_tokens = chunk_tokens
+        self.buckets = buckets
+
+    def path(self, digest):
+        return os.path.join(self.directory, digest)
+
+    def load(self, digest):
+        try:
+            index = NotesIndex(self.path(digest))
+        except (OSError, ValueError, KeyError):
+            return None
+        meta = index.meta
+        if (meta.get("version"), meta.get("buckets"), meta.get("chunk_tokens")) != \
+                (INDEX_VERSION, self.buckets, self.chunk_tokens):
+            return None
+        return index
+
+    def get(self, digest, text):
+        index = self.load(digest)
+        if index is None:
+            build_index(text, self.path(digest), self.chunk_tokens, self.buckets)
+            index = NotesIndex(self.path(digest))
+        return index
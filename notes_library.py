@@ -0,0 +1,122 @@
+import os
+import time
+import threading
+from collections import namedtuple
+import numpy as np
+from config import LIBRARY_DIR
+from database import get_pool
+
+LibraryDocument = namedtuple("LibraryDocument", ["digest", "title", "pages", "size", "added_at"])
+
+SELECT_DOCUMENTS = ("SELECT digest, title, pages, size, added_at FROM library_documents "
+                    "WHERE username = ? ORDER BY added_at DESC")
+INSERT_DOCUMENT = ("INSERT OR REPLACE INTO library_documents (username, digest, title, pages, size, added_at) "
+                   "VALUES (?, ?, ?, ?, ?, ?)")
+DELETE_DOCUMENT = "DELETE FROM library_documents WHERE username = ? AND digest = ?"
+
+
+class StoredText:
+    # The extracted text of one document: its pages joined by newlines in a
+    # UTF-8 file that is memory-mapped, plus the byte offset where each page
+    # starts. Nothing is read until a page or the whole text is asked for.
+    def __init__(self, text_path, offsets_path):
+        self.offsets = np.load(offsets_path, mmap_mode='r')
+        self.data = np.memmap(text_path, dtype=np.uint8, mode='r') if self.offsets[-1] else np.zeros(0, np.uint8)
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    @property
+    def size(self):
+        return int(self.offsets[-1])
+
+    def page(self, i):
+        # Every page but the last is followed by its newline separator
+        stop = self.offsets[i + 1] - (1 if i < len(self) - 1 else 0)
+        return self.data[self.offsets[i]:stop].tobytes().decode('utf-8')
+
+    def pages(self):
+        return [self.page(i) for i in range(len(self))]
+
+    def read(self):
+        return self.data.tobytes().decode('utf-8')
+
+
+class TextStore:
+    # Extracted page text, shared by every user and keyed by the SHA-256 of the
+    # PDF, so the same notes are never parsed twice
+    def __init__(self, directory=os.path.join(LIBRARY_DIR, "text")):
+        self.directory = directory
+
+    def paths(self, digest):
+        return os.path.join(self.directory, f"{digest}.txt"), os.path.join(self.directory, f"{digest}.pages.npy")
+
+    def load(self, digest):
+        text_path, offsets_path = self.paths(digest)
+        try:
+            return StoredText(text_path, offsets_path)
+        except (OSError, ValueError):
+            return None
+
+    def store(self, digest, pages):
+        os.makedirs(self.directory, exist_ok=True)
+        text_path, offsets_path = self.paths(digest)
+        encoded = [page.encode('utf-8') for page in pages]
+        offsets = np.zeros(len(pages) + 1, dtype=np.int64)
+        np.cumsum([len(data) + 1 for data in encoded], out=offsets[1:])
+        if len(pages):
+            offsets[-1] -= 1
+        # The offsets are written last, so a text file without them is never loaded
+        with open(text_path + ".tmp", 'wb') as f:
+            f.write(b"\n".join(encoded))
+        os.replace(text_path + ".tmp", text_path)
+        with open(offsets_path + ".tmp", 'wb') as f:
+            np.save(f, offsets)
+        os.replace(offsets_path + ".tmp", offsets_path)
+        return StoredText(text_path, offsets_path)
+
+
+class NotesLibrary:
+    # Which documents each user has uploaded. The rows are small; the text stays
+    # in the TextStore until a summary or quiz opens it.
+    def __init__(self, pool, store=None):
+        self.pool = pool
+        self.store = store or TextStore()
+        with self.pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS library_documents
+                            (username TEXT NOT NULL, digest TEXT NOT NULL, title TEXT, pages INTEGER,
+                             size INTEGER, added_at REAL, PRIMARY KEY (username, digest))''')
+
+    def add(self, username, digest, title, pages, size):
+        document = LibraryDocument(digest, title, pages, size, time.time())
+        with self.pool.connection() as conn:
+            conn.execute(INSERT_DOCUMENT, (username,) + tuple(document))
+        return document
+
+    def remove(self, username, digest):
+        # The text stays on disk; other users may have the same document
+        with self.pool.connection() as conn:
+            conn.execute(DELETE_DOCUMENT, (username, digest))
+
+    def documents(self, username):
+        with self.pool.connection() as conn:
+            return [LibraryDocument(*row) for row in conn.execute(SELECT_DOCUMENTS, (username,))]
+
+    def open(self, digest):
+        # Raises RuntimeError if the text is missing, e.g. after the library folder was deleted
+        text = self.store.load(digest)
+        if text is None:
+            raise RuntimeError(f"The text of document {digest[:12]} is missing; upload it again")
+        return text
+
+
+_library = None
+_library_lock = threading.Lock()
+
+
+def get_notes_library():
+    global _library
+    with _library_lock:
+        if _library is None:
+            _library = NotesLibrary(get_pool())
+        return _library
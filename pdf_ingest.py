@@ -0,0 +1,101 @@
+import os
+import hashlib
+import threading
+import multiprocessing
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from PyQt5.QtCore import QThread, pyqtSignal
+import PyPDF2
+from config import PDF_WORKERS, PDF_PAGES_PER_TASK
+from notes_index import IndexStore
+from notes_library import TextStore
+
+# `text` is the StoredText in the library's text store; len(text) is the page count
+PdfDocument = namedtuple("PdfDocument", ["path", "digest", "text", "cached"])
+
+
+def file_digest(path):
+    sha = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            sha.update(block)
+    return sha.hexdigest()
+
+
+def extract_pages(path, start, stop):
+    # Runs in a worker process; each task opens its own reader
+    reader = PyPDF2.PdfReader(path)
+    return start, [reader.pages[i].extract_text() or "" for i in range(start, stop)]
+
+
+def worker_count():
+    return min(PDF_WORKERS, os.cpu_count() or 1)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_process_pool():
+    # Started on the first large PDF and reused afterwards. Workers are spawned
+    # rather than forked, since forking a process that runs Qt threads is unsafe.
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = ProcessPoolExecutor(max_workers=worker_count(), mp_context=multiprocessing.get_context("spawn"))
+        return _pool
+
+
+def extract_text(path, store=None, progress=None, pages_per_task=PDF_PAGES_PER_TASK):
+    # Returns a PdfDocument; progress(done, total) is called as pages come in
+    store = store or TextStore()
+    digest = file_digest(path)
+    stored = store.load(digest)
+    if stored is not None:
+        return PdfDocument(path, digest, stored, True)
+
+    reader = PyPDF2.PdfReader(path)
+    total = len(reader.pages)
+    if progress:
+        progress(0, total)
+    if total <= pages_per_task or worker_count() == 1:
+        # Not worth the worker processes (or no spare cores to run them on)
+        pages = []
+        for page in reader.pages:
+            pages.append(page.extract_text() or "")
+            if progress:
+                progress(len(pages), total)
+    else:
+        pages = [None] * total
+        done = 0
+        futures = [get_process_pool().submit(extract_pages, path, start, min(start + pages_per_task, total))
+                   for start in range(0, total, pages_per_task)]
+        for future in as_completed(futures):
+            start, texts = future.result()
+            pages[start:start + len(texts)] = texts
+            done += len(texts)
+            if progress:
+                progress(done, total)
+    return PdfDocument(path, digest, store.store(digest, pages), False)
+
+
+class PdfIngestWorker(QThread):
+    # Extracts a PDF off the GUI thread and reports pages done for the progress bar,
+    # then builds the document's topic index unless it is already on disk
+    progress = pyqtSignal(int, int)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, path):
+        super().__init__()
+        self.path = path
+
+    def run(self):
+        try:
+            document = extract_text(self.path, progress=self.progress.emit)
+            index_store = IndexStore()
+            if index_store.load(document.digest) is None:
+                index_store.get(document.digest, document.text.read())
+            self.succeeded.emit(document)
+        except Exception as e:
+            self.failed.emit(e)
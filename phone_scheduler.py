@@ -0,0 +1,51 @@
+import cv2
+import numpy as np
+from config import PHONE_DETECT_INTERVAL, PHONE_BOOST_INTERVAL, PHONE_BOOST_DURATION, MOTION_THRESHOLD
+
+MOTION_THUMB_SIZE = (64, 48)  # Resolution the motion score is computed at
+
+
+class PhoneDetectionScheduler:
+    # Decides which frames get a full YOLO pass. During quiet stretches YOLO only
+    # runs every PHONE_DETECT_INTERVAL frames, unless a cheap scene-change score
+    # says the picture moved. Once a phone is seen the cadence is raised for a
+    # while so a real phone is confirmed quickly.
+    def __init__(self, interval=PHONE_DETECT_INTERVAL, boost_interval=PHONE_BOOST_INTERVAL,
+                 boost_duration=PHONE_BOOST_DURATION, motion_threshold=MOTION_THRESHOLD):
+        self.interval = interval
+        self.boost_interval = boost_interval
+        self.boost_duration = boost_duration
+        self.motion_threshold = motion_threshold
+        self.reference_thumb = None
+        self.frames_since_run = 0
+        self.boost_until = 0
+        self.frames_seen = 0
+        self.frames_run = 0
+
+    def motion_score(self, frame):
+        # Mean absolute difference (0-1) against the last frame YOLO actually saw
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        thumb = cv2.resize(gray, MOTION_THUMB_SIZE, interpolation=cv2.INTER_AREA)
+        if self.reference_thumb is None:
+            return 1.0, thumb
+        return float(np.mean(cv2.absdiff(thumb, self.reference_thumb))) / 255.0, thumb
+
+    def should_run(self, frame, now):
+        self.frames_seen += 1
+        self.frames_since_run += 1
+        score, thumb = self.motion_score(frame)
+        interval = self.boost_interval if now < self.boost_until else self.interval
+        if self.frames_since_run >= interval or score >= self.motion_threshold:
+            self.frames_since_run = 0
+            self.frames_run += 1
+            self.reference_thumb = thumb
+            return True
+        return False
+
+    def record(self, phone_detected, now):
+        if phone_detected:
+            self.boost_until = now + self.boost_duration
+
+    @property
+    def run_ratio(self):
+        return self.frames_run / self.frames_seen if self.frames_seen else 0.0
@@ -0,0 +1,65 @@
+import collections
+import threading
+import time
+
+
+class LatestFrameQueue:
+    # Bounded hand-off between pipeline stages. When the queue is full the
+    # oldest item is discarded, so a slow consumer always picks up the
+    # freshest frame instead of working through a backlog of stale ones.
+    def __init__(self, maxsize=1):
+        self.maxsize = maxsize
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            if self._closed:
+                return
+            if len(self._items) >= self.maxsize:
+                self._items.popleft()
+                self.dropped += 1
+            self._items.append(item)
+            self._cond.notify()
+
+    def get(self, timeout=None):
+        # Returns None on timeout or once the queue has been closed and drained
+        with self._cond:
+            self._cond.wait_for(lambda: self._items or self._closed, timeout)
+            if self._items:
+                return self._items.popleft()
+            return None
+
+    def clear(self):
+        # Empties the queue and starts the dropped count over
+        with self._cond:
+            self._items.clear()
+            self.dropped = 0
+
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    def __len__(self):
+        with self._cond:
+            return len(self._items)
+
+
+class FramePacer:
+    # Sleeps just long enough to hold a loop at the target rate, accounting for
+    # the time already spent on the current iteration.
+    def __init__(self, fps):
+        self.interval = 1.0 / fps
+        self._deadline = time.monotonic()
+
+    def wait(self):
+        self._deadline += self.interval
+        delay = self._deadline - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+        else:
+            # Fell behind; resynchronise rather than bursting to catch up
+            self._deadline = time.monotonic()
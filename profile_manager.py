@@ -1,10 +1,8 @@
-import sqlite3
-import bcrypt
 from PyQt5.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QLineEdit, QPushButton, QMessageBox, QFrame
 from PyQt5.QtCore import Qt
 from PyQt5.QtGui import QFont
-
-DB_PATH = "users.db"
+from database import get_user_repository
+from auth_service import AuthWorker, update_profile
 
 class ProfileManager(QWidget):
     def __init__(self, username):
@@ -139,17 +137,13 @@ class ProfileManager(QWidget):
         self.setLayout(layout)
 
     def load_user_data(self):
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        c.execute("SELECT name, phone, guardian_name, guardian_phone FROM users WHERE username = ?", (self.username,))
-        result = c.fetchone()
-        conn.close()
-
-        if result:
-            self.name_input.setText(result[0])
-            self.phone_input.setText(result[1])
-            self.guardian_name_input.setText(result[2])
-            self.guardian_phone_input.setText(result[3])
+        profile = get_user_repository().get_profile(self.username)
+
+        if profile:
+            self.name_input.setText(profile.name)
+            self.phone_input.setText(profile.phone)
+            self.guardian_name_input.setText(profile.guardian_name)
+            self.guardian_phone_input.setText(profile.guardian_phone)
 
     def save_changes(self):
         phone = self.phone_input.text()
@@ -179,22 +173,24 @@ class ProfileManager(QWidget):
                 QMessageBox.warning(self, "Error", "Password must be at least 6 characters")
                 return
 
-        # Update database
-        conn = sqlite3.connect(DB_PATH)
-        c = conn.cursor()
-        try:
-            if new_password:
-                hashed_pw = bcrypt.hashpw(new_password.encode('utf-8'), bcrypt.gensalt())
-                c.execute("UPDATE users SET phone = ?, guardian_name = ?, guardian_phone = ?, password = ? WHERE username = ?",
-                          (phone, guardian_name, guardian_phone, hashed_pw.decode('utf-8'), self.username))
-            else:
-                c.execute("UPDATE users SET phone = ?, guardian_name = ?, guardian_phone = ? WHERE username = ?",
-                          (phone, guardian_name, guardian_phone, self.username))
-            conn.commit()
-            QMessageBox.information(self, "Success", "Profile updated successfully")
-            self.new_password_input.clear()
-            self.confirm_password_input.clear()
-        except Exception as e:
-            QMessageBox.warning(self, "Error", f"Failed to update profile: {e}")
-        finally:
-            conn.close()
+        # Update database (this also invalidates the cached profile); a new
+        # password is hashed on a worker thread so the window stays responsive
+        self.save_btn.setEnabled(False)
+        self.save_btn.setText("Saving...")
+        self.save_worker = AuthWorker(update_profile, self.username, phone, guardian_name, guardian_phone,
+                                      new_password or None)
+        self.save_worker.succeeded.connect(self.save_finished)
+        self.save_worker.failed.connect(self.save_failed)
+        self.save_worker.start()
+
+    def save_finished(self, _):
+        self.save_btn.setEnabled(True)
+        self.save_btn.setText("Save Changes")
+        QMessageBox.information(self, "Success", "Profile updated successfully")
+        self.new_password_input.clear()
+        self.confirm_password_input.clear()
+
+    def save_failed(self, error):
+        self.save_btn.setEnabled(True)
+        self.save_btn.setText("Save Changes")
+        QMessageBox.warning(self, "Error", f"Failed to update profile: {error}")
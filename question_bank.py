@@ -0,0 +1,103 @@
+import json
+import time
+import threading
+from collections import namedtuple
+from config import QUESTION_BOX_INTERVALS
+from database import get_pool
+
+BankStats = namedtuple("BankStats", ["questions", "due", "unseen", "answered"])
+
+INSERT_QUESTION = ("INSERT OR IGNORE INTO questions (doc_digest, question, options, correct_answer, created_at) "
+                   "VALUES (?, ?, ?, ?, ?)")
+SELECT_QUESTIONS = "SELECT q.id, q.question, q.options, q.correct_answer FROM questions q "
+
+
+def to_question(row):
+    question_id, question, options, correct_answer = row
+    return {"id": question_id, "question": question, "options": json.loads(options), "correct_answer": correct_answer}
+
+
+class QuestionBank:
+    # Generated questions per set of documents (keyed by the SHA-256 of each PDF,
+    # plus the topic for topic-focused quizzes) and each user's answers to them. Quizzes
+    # are drawn with a Leitner scheduler: a right answer moves the question up a
+    # box and pushes its next review further out (QUESTION_BOX_INTERVALS), a
+    # wrong one sends it back to box 0.
+    def __init__(self, pool, intervals=QUESTION_BOX_INTERVALS):
+        self.pool = pool
+        self.intervals = intervals
+        with self.pool.connection() as conn:
+            conn.execute('''CREATE TABLE IF NOT EXISTS questions
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, doc_digest TEXT NOT NULL, question TEXT NOT NULL,
+                             options TEXT NOT NULL, correct_answer TEXT NOT NULL, created_at REAL,
+                             UNIQUE (doc_digest, question))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS question_progress
+                            (username TEXT NOT NULL, question_id INTEGER NOT NULL, box INTEGER NOT NULL,
+                             due_at REAL NOT NULL, PRIMARY KEY (username, question_id))''')
+            conn.execute('''CREATE TABLE IF NOT EXISTS answers
+                            (id INTEGER PRIMARY KEY AUTOINCREMENT, username TEXT NOT NULL, question_id INTEGER NOT NULL,
+                             chosen TEXT, correct INTEGER NOT NULL, answered_at REAL NOT NULL)''')
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_progress_due ON question_progress (username, due_at)")
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_answers_user ON answers (username, answered_at)")
+
+    def add(self, doc_digest, question):
+        # Returns the question with its bank id, or None if the bank already had it
+        with self.pool.connection() as conn:
+            cursor = conn.execute(INSERT_QUESTION, (doc_digest, question["question"], json.dumps(question["options"]),
+                                                    question["correct_answer"], time.time()))
+            if cursor.rowcount == 0:
+                return None
+            return dict(question, id=cursor.lastrowid)
+
+    def known_questions(self, doc_digest):
+        with self.pool.connection() as conn:
+            return [row[0] for row in conn.execute("SELECT question FROM questions WHERE doc_digest = ?", (doc_digest,))]
+
+    def sample(self, username, doc_digest, count, now=None):
+        # Due questions first (lowest box, longest overdue), then ones the user
+        # has never seen. Questions not yet due are left out, so a short result
+        # means the bank is running low and new questions should be generated.
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            due = conn.execute(SELECT_QUESTIONS + "JOIN question_progress p ON p.question_id = q.id "
+                               "WHERE q.doc_digest = ? AND p.username = ? AND p.due_at <= ? "
+                               "ORDER BY p.box, p.due_at LIMIT ?", (doc_digest, username, now, count)).fetchall()
+            unseen = conn.execute(SELECT_QUESTIONS + "WHERE q.doc_digest = ? AND NOT EXISTS "
+                                  "(SELECT 1 FROM question_progress p WHERE p.question_id = q.id AND p.username = ?) "
+                                  "ORDER BY q.id LIMIT ?", (doc_digest, username, count - len(due))).fetchall()
+        return [to_question(row) for row in due + unseen]
+
+    def record_answer(self, username, question_id, chosen, correct, now=None):
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            row = conn.execute("SELECT box FROM question_progress WHERE username = ? AND question_id = ?",
+                               (username, question_id)).fetchone()
+            box = min((row[0] if row else 0) + 1, len(self.intervals) - 1) if correct else 0
+            conn.execute("INSERT OR REPLACE INTO question_progress (username, question_id, box, due_at) VALUES (?, ?, ?, ?)",
+                         (username, question_id, box, now + self.intervals[box]))
+            conn.execute("INSERT INTO answers (username, question_id, chosen, correct, answered_at) VALUES (?, ?, ?, ?, ?)",
+                         (username, question_id, chosen, int(correct), now))
+        return box
+
+    def stats(self, username, doc_digest, now=None):
+        now = time.time() if now is None else now
+        with self.pool.connection() as conn:
+            questions = conn.execute("SELECT COUNT(*) FROM questions WHERE doc_digest = ?", (doc_digest,)).fetchone()[0]
+            seen, due = conn.execute("SELECT COUNT(*), COALESCE(SUM(p.due_at <= ?), 0) FROM question_progress p "
+                                     "JOIN questions q ON q.id = p.question_id WHERE q.doc_digest = ? AND p.username = ?",
+                                     (now, doc_digest, username)).fetchone()
+            answered = conn.execute("SELECT COUNT(*) FROM answers a JOIN questions q ON q.id = a.question_id "
+                                    "WHERE q.doc_digest = ? AND a.username = ?", (doc_digest, username)).fetchone()[0]
+        return BankStats(questions, due, questions - seen, answered)
+
+
+_bank = None
+_bank_lock = threading.Lock()
+
+
+def get_question_bank():
+    global _bank
+    with _bank_lock:
+        if _bank is None:
+            _bank = QuestionBank(get_pool())
+        return _bank
@@ -0,0 +1,226 @@
+import json
+import math
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PyQt5.QtCore import QThread, pyqtSignal
+from config import (QUIZ_QUESTIONS_PER_REQUEST, QUIZ_CHUNK_TOKENS, QUIZ_MAX_IN_FLIGHT, QUIZ_MAX_RETRIES)
+from llm_cache import get_llm_cache
+from text_chunks import split_chunks, read_text
+
+# {count} and {variant} are filled in per request; {text} by the response cache
+QUESTION_PROMPT = """Write {count} multiple-choice questions based on the notes below (question set {variant}).
+Answer with a JSON array and nothing else, one object per question:
+[
+    {{
+        "question": "Question text",
+        "options": ["Option A", "Option B", "Option C", "Option D"],
+        "correct_answer": "Option A"
+    }}
+]
+correct_answer must be copied exactly from options.
+
+Notes:
+
+{text}"""
+
+
+class QuizCancelled(Exception):
+    pass
+
+
+class JSONObjectStream:
+    # Pulls top-level JSON objects out of text that arrives in pieces. Anything
+    # outside an object (code fences, the surrounding array, prose) is skipped,
+    # and each object is decoded as soon as its closing brace arrives, so one
+    # malformed question does not cost the others.
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        self.escaped = False
+        self.current = []
+
+    def feed(self, text):
+        # Returns a list of decoded objects, with None for each object that was not valid JSON
+        objects = []
+        for char in text:
+            if self.depth == 0:
+                if char == '{':
+                    self.depth = 1
+                    self.current = [char]
+                continue
+            self.current.append(char)
+            if self.in_string:
+                if self.escaped:
+                    self.escaped = False
+                elif char == '\\':
+                    self.escaped = True
+                elif char == '"':
+                    self.in_string = False
+            elif char == '"':
+                self.in_string = True
+            elif char == '{':
+                self.depth += 1
+            elif char == '}':
+                self.depth -= 1
+                if self.depth == 0:
+                    try:
+                        objects.append(json.loads("".join(self.current)))
+                    except ValueError:
+                        objects.append(None)
+        return objects
+
+
+def validate_question(item):
+    # Returns the question in the shape display_quiz expects, or None
+    if not isinstance(item, dict):
+        return None
+    question, options, answer = item.get("question"), item.get("options"), item.get("correct_answer")
+    if not isinstance(question, str) or not question.strip() or not isinstance(options, list):
+        return None
+    options = [option.strip() for option in options if isinstance(option, str) and option.strip()]
+    if len(options) < 2 or len(set(options)) != len(options) or not isinstance(answer, str):
+        return None
+    answer = answer.strip()
+    if answer not in options:
+        # Models sometimes answer with the option's letter instead of its text
+        letter = answer.rstrip(").").upper()
+        if len(letter) == 1 and "A" <= letter < chr(ord("A") + len(options)):
+            answer = options[ord(letter) - ord("A")]
+        else:
+            return None
+    return {"question": question.strip(), "options": options, "correct_answer": answer}
+
+
+class QuizEngine:
+    # Builds a quiz from requests spread over different chunks of the notes,
+    # run concurrently. Responses are streamed and every question is validated
+    # and handed to on_question as soon as its JSON object is complete. When
+    # some questions are invalid, only that many are asked for again.
+    def __init__(self, client, cache=None, per_request=QUIZ_QUESTIONS_PER_REQUEST, chunk_tokens=QUIZ_CHUNK_TOKENS,
+                 max_in_flight=QUIZ_MAX_IN_FLIGHT, max_retries=QUIZ_MAX_RETRIES):
+        self.client = client
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.per_request = per_request
+        self.chunk_tokens = chunk_tokens
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.invalid = 0
+
+    def select_chunks(self, documents, count):
+        # As many chunks as the quiz has requests, and at least one per document while
+        # the count allows. Documents take turns so the first chunks come from different
+        # documents; each is read and split only while its share is picked
+        requests = max(math.ceil(count / self.per_request), min(len(documents), count))
+        per_document = math.ceil(requests / len(documents))
+        shares = [split_chunks(read_text(document), self.chunk_tokens)[:per_document] for document in documents]
+        return [share[i] for i in range(per_document) for share in shares if i < len(share)]
+
+    def plan(self, chunks, count, first_variant=1):
+        # (chunk index, questions, variant) per request. The count is split evenly over
+        # the requests, one per chunk while the count allows, cycling through the chunks
+        requests = max(math.ceil(count / self.per_request), min(len(chunks), count))
+        base, extra = divmod(count, requests)
+        return [(i % len(chunks), base + (i < extra), first_variant + i // len(chunks)) for i in range(requests)]
+
+    def ask(self, chunk, count, variant, accept, cancel):
+        # Runs one request; returns how many of its questions were accepted
+        template = QUESTION_PROMPT.replace("{count}", str(count)).replace("{variant}", str(variant))
+        cached = self.cache.get(self.client.name, template, chunk)
+        pieces = [cached] if cached is not None else self.client.stream(template.format(text=chunk))
+        if cached is None:
+            with self.lock:
+                self.requests += 1
+        parser, received, accepted, invalid = JSONObjectStream(), [], 0, 0
+        for piece in pieces:
+            if cancel is not None and cancel.is_set():
+                raise QuizCancelled()
+            received.append(piece)
+            for item in parser.feed(piece):
+                question = validate_question(item)
+                if question is not None and accept(question):
+                    accepted += 1
+                elif question is None:
+                    invalid += 1
+                    with self.lock:
+                        self.invalid += 1
+        # A response with invalid questions is not served again, so asking later can fill the gap
+        if invalid and cached is not None:
+            self.cache.discard(self.client.name, template, chunk)
+        elif not invalid and cached is None:
+            self.cache.put(self.client.name, template, chunk, "".join(received))
+        return min(accepted, count)
+
+    def generate(self, text, count, on_question=None, cancel=None, exclude=(), first_variant=1):
+        # `text` is the notes or a list of documents to draw questions from. Questions
+        # whose text is in `exclude` are skipped; a different first_variant asks for
+        # question sets earlier runs (and their cached responses) did not.
+        documents = [text] if isinstance(text, str) else text
+        if not documents or count <= 0:
+            return []
+        chunks = self.select_chunks(documents, count)
+        if not chunks:
+            return []
+        questions, seen = [], {question.lower() for question in exclude}
+
+        def accept(question):
+            key = question["question"].lower()
+            with self.lock:
+                if key in seen or len(questions) >= count:
+                    return False
+                seen.add(key)
+                questions.append(question)
+            if on_question:
+                on_question(question)
+            return True
+
+        tasks = self.plan(chunks, count, first_variant)
+        # Retries get variants no first attempt uses, so they are fresh requests rather
+        # than the cached answer, yet stay the same across runs and hit the cache next time
+        variants = max(variant for _, _, variant in tasks) - first_variant + 1
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="quiz") as executor:
+            for attempt in range(self.max_retries + 1):
+                futures = {executor.submit(self.ask, chunks[index], n, variant + attempt * variants, accept, cancel):
+                           (index, n, variant) for index, n, variant in tasks}
+                retry = []
+                for future in as_completed(futures):
+                    index, n, variant = futures[future]
+                    missing = n - future.result()
+                    if missing > 0:
+                        retry.append((index, missing, variant))
+                if len(questions) >= count or not retry:
+                    break
+                tasks = retry
+        if len(questions) < count:
+            print(f"[ERROR] Quiz generation produced {len(questions)} of {count} valid questions")
+        return questions
+
+
+class QuizWorker(QThread):
+    # Runs QuizEngine.generate off the GUI thread, emitting each question as it is accepted
+    question = pyqtSignal(object)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, engine, documents, count, exclude=(), first_variant=1):
+        super().__init__()
+        self.engine = engine
+        self.documents = documents
+        self.count = count
+        self.exclude = exclude
+        self.first_variant = first_variant
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            self.succeeded.emit(self.engine.generate(self.documents, self.count, on_question=self.question.emit,
+                                                     cancel=self.cancel_event, exclude=self.exclude,
+                                                     first_variant=self.first_variant))
+        except QuizCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(e)
@@ -0,0 +1,114 @@
+import collections
+import threading
+import time
+from config import SPEECH_RATE, SPEECH_MAX_AGE
+
+
+class SpeechService:
+    # Speaks alerts on a dedicated worker so callers never block on runAndWait().
+    # A message that is already waiting is not queued twice, and anything that
+    # waited longer than SPEECH_MAX_AGE seconds is dropped as stale.
+    def __init__(self, rate=SPEECH_RATE, max_age=SPEECH_MAX_AGE):
+        self.rate = rate
+        self.max_age = max_age
+        self.pending = collections.OrderedDict()  # message -> time it was (last) requested
+        self.cond = threading.Condition()
+        self.engine = None
+        self.speaking = False
+        self.interrupt = False  # Set by cancel(); the speech thread stops the engine at the next word
+        self.running = True
+        self.spoken = 0
+        self.coalesced = 0
+        self.dropped = 0
+        self.last_queue_latency = None
+        self.thread = threading.Thread(target=self.run, name="speech", daemon=True)
+        self.thread.start()
+
+    def say(self, message):
+        with self.cond:
+            if not self.running:
+                return
+            if message in self.pending:
+                self.coalesced += 1
+                self.pending.move_to_end(message)
+            self.pending[message] = time.monotonic()
+            self.cond.notify()
+
+    def cancel(self):
+        # Forget everything queued and cut off the current utterance
+        with self.cond:
+            self.dropped += len(self.pending)
+            self.pending.clear()
+            if self.speaking:
+                self.interrupt = True
+
+    def on_word(self, name, location, length):
+        # Runs on the speech thread inside runAndWait(), the only place engine.stop() may be called from
+        if self.interrupt:
+            self.engine.stop()
+
+    def run(self):
+        # The engine lives on this thread; pyttsx3 drivers are not safe to share across threads
+        try:
+            import pyttsx3
+            self.engine = pyttsx3.init()
+            self.engine.setProperty('rate', self.rate)
+            self.engine.connect('started-word', self.on_word)
+        except Exception as e:
+            print(f"[ERROR] Text-to-speech unavailable, alerts will not be spoken: {e}")
+            with self.cond:
+                self.running = False
+                self.pending.clear()
+            return
+        while True:
+            with self.cond:
+                self.cond.wait_for(lambda: self.pending or not self.running)
+                if not self.running:
+                    break
+                message, requested_at = self.pending.popitem(last=False)
+                waited = time.monotonic() - requested_at
+                if waited > self.max_age:
+                    self.dropped += 1
+                    print(f"[DEBUG] Dropped stale alert after {waited:.1f}s: {message}")
+                    continue
+                self.speaking = True
+                self.interrupt = False
+            self.last_queue_latency = waited
+            print(f"[DEBUG] Speaking: {message} (queued {waited * 1000:.0f} ms)")
+            try:
+                self.engine.say(message)
+                self.engine.runAndWait()
+                self.spoken += 1
+            except Exception as e:
+                print(f"[ERROR] Text-to-speech failed: {e}")
+            finally:
+                with self.cond:
+                    self.speaking = False
+
+    def shutdown(self):
+        self.cancel()
+        with self.cond:
+            self.running = False
+            self.cond.notify_all()
+        self.thread.join(timeout=2)
+
+
+_service = None
+_service_lock = threading.Lock()
+
+
+def get_speech_service():
+    # One speech worker per process, shared by every window
+    global _service
+    with _service_lock:
+        if _service is None:
+            _service = SpeechService()
+        return _service
+
+
+def shutdown_speech_service():
+    global _service
+    with _service_lock:
+        if _service is not None:
+            _service.shutdown()
+            _service = None
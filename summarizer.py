@@ -0,0 +1,168 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from PyQt5.QtCore import QThread, pyqtSignal
+from config import SUMMARY_CHUNK_TOKENS, SUMMARY_MAX_IN_FLIGHT, SUMMARY_REDUCE_FAN_IN
+from llm import estimate_tokens
+from llm_cache import get_llm_cache
+from text_chunks import split_chunks, read_text
+
+CHUNK_PROMPT = "Summarize this section of a student's notes. Keep the key facts, definitions and formulas:\n\n{text}"
+REDUCE_PROMPT = ("Combine these partial summaries of one document into a single, well-organised summary "
+                 "without repeating points:\n\n{text}")
+
+
+class SummaryCancelled(Exception):
+    pass
+
+
+def stage_progress(progress, stage):
+    if progress is None:
+        return None
+    return lambda done, total: progress(stage, done, total)
+
+
+class Summarizer:
+    # Map-reduce summarization: the notes are split into token-bounded chunks
+    # that are summarized concurrently (at most max_in_flight requests at a
+    # time), then the partial summaries are combined level by level until one
+    # remains. Every request goes through the LLM response cache, so only
+    # chunks that changed since the last run are sent again.
+    def __init__(self, client, cache=None, chunk_tokens=SUMMARY_CHUNK_TOKENS,
+                 max_in_flight=SUMMARY_MAX_IN_FLIGHT, fan_in=SUMMARY_REDUCE_FAN_IN):
+        self.client = client
+        self.cache = cache if cache is not None else get_llm_cache()
+        self.chunk_tokens = chunk_tokens
+        self.max_in_flight = max_in_flight
+        self.fan_in = fan_in
+        self.requests = 0
+        self.cache_hits = 0
+        self.lock = threading.Lock()
+
+    def complete(self, template, text, on_text=None, cancel=None):
+        # With on_text the response is streamed and handed over piece by piece;
+        # a cached response arrives as a single piece
+        if cancel is not None and cancel.is_set():
+            raise SummaryCancelled()
+        response = self.cache.get(self.client.name, template, text)
+        with self.lock:
+            if response is not None:
+                self.cache_hits += 1
+            else:
+                self.requests += 1
+        if response is not None:
+            if on_text:
+                on_text(response)
+            return response
+        prompt = template.format(text=text)
+        if on_text is None:
+            response = self.client.generate(prompt)
+        else:
+            pieces = []
+            for piece in self.client.stream(prompt):
+                if cancel is not None and cancel.is_set():
+                    raise SummaryCancelled()
+                pieces.append(piece)
+                on_text(piece)
+            response = "".join(pieces)
+        self.cache.put(self.client.name, template, text, response)
+        return response
+
+    def run_prompts(self, executor, template, texts, progress=None, cancel=None):
+        results = [None] * len(texts)
+        futures = {executor.submit(self.complete, template, text, None, cancel): i for i, text in enumerate(texts)}
+        for done, future in enumerate(as_completed(futures), 1):
+            results[futures[future]] = future.result()
+            if progress:
+                progress(done, len(texts))
+        return results
+
+    def group(self, summaries):
+        # Consecutive partial summaries that fit in one reduce prompt
+        groups, current, tokens = [], [], 0
+        for summary in summaries:
+            size = estimate_tokens(summary)
+            if current and (len(current) == self.fan_in or tokens + size > self.chunk_tokens):
+                groups.append(current)
+                current, tokens = [], 0
+            current.append(summary)
+            tokens += size
+        groups.append(current)
+        return groups
+
+    def summarize(self, text, progress=None, on_text=None, cancel=None):
+        # progress(stage, done, total), stage being "map" or "reduce level N".
+        # Only the last request, which produces the final summary, is streamed
+        # to on_text; setting the `cancel` event stops at the next chunk or piece.
+        chunks = split_chunks(text, self.chunk_tokens)
+        if not chunks:
+            return ""
+        if len(chunks) == 1:
+            return self.complete(CHUNK_PROMPT, chunks[0], on_text, cancel)
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="summarize") as executor:
+            summaries = self.run_prompts(executor, CHUNK_PROMPT, chunks, stage_progress(progress, "map"), cancel)
+            return self.reduce(executor, summaries, progress, on_text, cancel)
+
+    def reduce(self, executor, summaries, progress=None, on_text=None, cancel=None):
+        # Combines partial summaries level by level; the last request is streamed to on_text
+        level = 1
+        while True:
+            groups = self.group(summaries)
+            if len(groups) == len(summaries) > 1:
+                # Every summary is already too long to pair up; merge two at a time anyway
+                groups = [summaries[i:i + 2] for i in range(0, len(summaries), 2)]
+            if len(groups) == 1:
+                break
+            summaries = self.run_prompts(executor, REDUCE_PROMPT, ["\n\n".join(g) for g in groups],
+                                         stage_progress(progress, f"reduce level {level}"), cancel)
+            level += 1
+        return self.complete(REDUCE_PROMPT, "\n\n".join(groups[0]), on_text, cancel)
+
+    def summarize_documents(self, documents, progress=None, on_text=None, cancel=None):
+        # Several documents are summarized one at a time, each read from disk only
+        # while its own summary is made, and their summaries are then combined
+        if len(documents) == 1:
+            return self.summarize(read_text(documents[0]), progress, on_text, cancel)
+        summaries = []
+        for n, document in enumerate(documents, 1):
+            stage = f"document {n}/{len(documents)}"
+            document_progress = None if progress is None else \
+                lambda step, done, total, stage=stage: progress(f"{stage}, {step}", done, total)
+            summary = self.summarize(read_text(document), document_progress, cancel=cancel)
+            if summary:
+                summaries.append(summary)
+        if len(summaries) <= 1:
+            summary = summaries[0] if summaries else ""
+            if on_text and summary:
+                on_text(summary)
+            return summary
+        with ThreadPoolExecutor(max_workers=self.max_in_flight, thread_name_prefix="summarize") as executor:
+            return self.reduce(executor, summaries, progress, on_text, cancel)
+
+
+class SummaryWorker(QThread):
+    # Runs Summarizer.summarize_documents off the GUI thread, streaming the final
+    # summary through `text`. A cancelled run emits nothing; the GUI has already
+    # disconnected from it by then.
+    progress = pyqtSignal(str, int, int)
+    text = pyqtSignal(str)
+    succeeded = pyqtSignal(object)
+    failed = pyqtSignal(object)
+
+    def __init__(self, summarizer, documents):
+        super().__init__()
+        self.summarizer = summarizer
+        self.documents = documents
+        self.cancel_event = threading.Event()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+    def run(self):
+        try:
+            summary = self.summarizer.summarize_documents(self.documents, progress=self.progress.emit,
+                                                          on_text=self.text.emit, cancel=self.cancel_event)
+            self.succeeded.emit(summary)
+        except SummaryCancelled:
+            pass
+        except Exception as e:
+            self.failed.emit(e)
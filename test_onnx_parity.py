@@ -0,0 +1,61 @@
+import os
+import pytest
+
+# The phone frames committed with the repo. Evidence saved later also lands in logs/,
+# so the set is listed rather than globbed and every run compares the same frames
+PARITY_FRAMES = [
+    "Mobile Phone_2025-03-24_09-05-39.jpg",
+    "Mobile Phone_2025-03-27_19-55-09.jpg",
+    "Mobile Phone_2025-03-27_20-01-48.jpg",
+    "Mobile Phone_2025-03-27_20-03-36.jpg",
+    "Mobile Phone_2025-03-27_20-03-41.jpg",
+    "Mobile Phone_2025-03-27_20-08-38.jpg",
+    "Mobile Phone_2025-03-27_20-15-56.jpg",
+    "Mobile Phone_2025-04-09_14-31-11.jpg",
+    "Mobile Phone_2025-04-14_16-02-34.jpg",
+    "Mobile Phone_2025-04-14_16-02-40.jpg",
+    "Mobile Phone_2025-04-14_16-02-46.jpg",
+    "Mobile Phone_2025-04-14_16-02-52.jpg",
+    "Mobile Phone_2025-04-14_16-18-10.jpg",
+    "Mobile Phone_2025-04-14_16-18-16.jpg",
+    "Mobile Phone_2025-04-14_16-18-23.jpg",
+    "Mobile Phone_2025-04-14_16-20-10.jpg",
+    "Mobile Phone_2025-04-14_16-20-21.jpg",
+    "Mobile Phone_2025-04-14_16-21-52.jpg",
+    "Mobile Phone_2025-04-14_16-22-02.jpg",
+    "Mobile Phone_2025-04-14_16-23-27.jpg",
+    "Mobile Phone_2025-04-14_16-26-51.jpg",
+    "Mobile Phone_2025-04-14_16-54-44.jpg",
+    "Mobile Phone_2025-04-14_16-55-22.jpg",
+    "Mobile Phone_2025-04-15_16-24-51.jpg",
+    "Mobile Phone_2025-04-15_16-25-00.jpg",
+    "Mobile Phone_2025-04-15_16-25-38.jpg",
+    "Mobile Phone_2025-04-15_16-45-50.jpg",
+    "Mobile Phone_2025-04-25_09-32-29.jpg",
+    "Mobile Phone_2025-04-25_09-32-34.jpg",
+    "Mobile Phone_2025-04-25_09-32-39.jpg",
+    "Mobile Phone_2025-04-25_09-32-44.jpg",
+    "Mobile Phone_2025-04-25_09-32-49.jpg",
+    "Mobile Phone_2025-04-25_09-32-54.jpg",
+    "Mobile Phone_2025-04-25_09-32-59.jpg",
+    "Mobile Phone_2025-04-25_09-33-04.jpg",
+    "Mobile Phone_2025-06-11_17-22-06.jpg",
+    "Mobile Phone_2025-06-11_17-24-27.jpg",
+    "Mobile Phone_2025-06-11_17-24-32.jpg",
+]
+MIN_IOU = 0.8  # Lowest acceptable IoU between the backends' top boxes
+
+
+def test_onnx_matches_torch(monkeypatch):
+    # Needs the optional ONNX requirements (requirements-onnx.txt) and the YOLO weights
+    pytest.importorskip("onnxruntime")
+    pytest.importorskip("ultralytics")
+    # The app's modules import each other by bare name and read paths relative to the repo
+    root = os.path.dirname(os.path.abspath(__file__))
+    monkeypatch.syspath_prepend(root)
+    monkeypatch.chdir(root)
+    from benchmark import parity_report
+
+    mismatches, _, worst_iou = parity_report([os.path.join("logs", name) for name in PARITY_FRAMES])
+    assert not mismatches, f"Backends disagree on phone presence in {mismatches}"
+    assert worst_iou >= MIN_IOU, f"Top-box IoU dropped to {worst_iou:.3f}"
@@ -0,0 +1,69 @@
+import re
+import zlib
+from config import CHARS_PER_TOKEN
+
+ANCHOR_EVERY = 8  # On average one piece in this many may end a chunk early (see split_chunks)
+SENTENCE_END = re.compile(r"(?<=[.!?])\s+")
+
+
+def split_pieces(text, max_chars):
+    # Paragraphs, with any paragraph longer than max_chars broken at sentence
+    # ends and any sentence longer than that cut outright
+    pieces = []
+    for paragraph in re.split(r"\n\s*\n", text):
+        paragraph = paragraph.strip()
+        if not paragraph:
+            continue
+        if len(paragraph) <= max_chars:
+            pieces.append(paragraph)
+            continue
+        current = ""
+        for sentence in SENTENCE_END.split(paragraph):
+            while len(sentence) > max_chars:
+                if current:
+                    pieces.append(current)
+                    current = ""
+                pieces.append(sentence[:max_chars])
+                sentence = sentence[max_chars:]
+            if current and len(current) + len(sentence) + 1 > max_chars:
+                pieces.append(current)
+                current = ""
+            current = f"{current} {sentence}" if current else sentence
+        if current:
+            pieces.append(current)
+    return pieces
+
+
+def read_text(document):
+    # Notes are passed around as strings or as stored text (notes_library.StoredText) read on demand
+    return document if isinstance(document, str) else document.read()
+
+
+def is_anchor(piece):
+    return zlib.crc32(piece.encode('utf-8')) % ANCHOR_EVERY == 0
+
+
+def split_chunks(text, max_tokens):
+    # Packs pieces into chunks of at most max_tokens. Besides the size limit a
+    # chunk also ends after an "anchor" piece, chosen by hashing the piece's own
+    # text, once it is a quarter full. Boundaries therefore depend on nearby
+    # content only: editing one paragraph changes one or two chunks and the rest
+    # of the document chunks exactly as before, so their cached results still apply.
+    max_chars = max_tokens * CHARS_PER_TOKEN
+    pieces = split_pieces(text, max_chars)
+    if sum(len(piece) + 2 for piece in pieces) <= max_chars:
+        # Short notes go out in one request, which can then be streamed directly
+        return ["\n\n".join(pieces)] if pieces else []
+    chunks, current, size = [], [], 0
+    for piece in pieces:
+        if current and size + len(piece) + 2 > max_chars:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+        current.append(piece)
+        size += len(piece) + 2
+        if is_anchor(piece) and size >= max_chars // 4:
+            chunks.append("\n\n".join(current))
+            current, size = [], 0
+    if current:
+        chunks.append("\n\n".join(current))
+    return chunks
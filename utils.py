@@ -1,10 +1,13 @@
+import numpy as np
+from ear import eye_aspect_ratios
+
 def eye_aspect_ratio(eye):
-    from scipy.spatial import distance
-    v1 = distance.euclidean(eye[1], eye[5])
-    v2 = distance.euclidean(eye[2], eye[4])
-    h = distance.euclidean(eye[0], eye[3])
-    ear = (v1 + v2) / (2.0 * h)
-    return ear
+    return float(eye_aspect_ratios(np.asarray(eye, dtype=np.float64)))
+
+def resolve_class_ids(names, class_names):
+    # Maps class labels (e.g. "cell phone") to the ids of a YOLO model's names dict
+    wanted = {name.lower() for name in class_names}
+    return [class_id for class_id, name in names.items() if name.lower() in wanted]
 
 def log_distraction(event):  # Unused in current code, kept for compatibility
     print(f"[DEBUG] Distraction: {event}")
\ No newline at end of file